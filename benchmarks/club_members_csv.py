@@ -0,0 +1,53 @@
+'''
+Benchmark of the member ingestion on a synthetic federation export, with more
+columns than used and a part of the members inactive.
+Run from the repository root: python -m benchmarks.club_members_csv [number of members]
+'''
+
+import os
+import sys
+import csv
+import time
+import random
+import logging
+import tempfile
+
+from lib.club_management import Club
+
+EXTRA_COLUMNS = 20
+GROUPS = ["Groep A", "Groep B", "Groep A, Groep C", "Masters", "Recreatie, Masters"]
+
+def write_members_csv(csv_path: str, number_of_members: int, rng: random.Random):
+    '''Members export with the team manager columns and some unused ones'''
+    with open(csv_path, "w", newline="", encoding="utf-8") as fo:
+        writer = csv.writer(fo)
+        writer.writerow(["ID", "LASTNAME", "FIRSTNAME", "GENDER", "ACTIVE", "GROUPS",
+                         "BIRTHDATE"] + [f"EXTRA{i}" for i in range(EXTRA_COLUMNS)])
+        for number in range(number_of_members):
+            writer.writerow([number, f"Last{number}", f"First{number}", rng.choice("12"),
+                             rng.choice("TTF"), rng.choice(GROUPS),
+                             f"05/01/{rng.randint(5, 14):02d} 00:00:00"] + \
+                            [f"value{i}" for i in range(EXTRA_COLUMNS)])
+
+def main():
+    '''Main'''
+    number_of_members = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    log = logging.getLogger("benchmark")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        csv_path = os.path.join(tmp_dir, "members.csv")
+        write_members_csv(csv_path, number_of_members, random.Random(42))
+
+        club = Club(log, "Benchmark")
+        start = time.perf_counter()
+        club.fill_using_members_csv(csv_path)
+        duration = time.perf_counter() - start
+
+    number_of_swimmers = sum(len(swimmers) for swimmers in club.members.values())
+    print(f"{number_of_members} members -> {number_of_swimmers} group entries in " + \
+          f"{len(club.members)} groups: {duration:.3f}s " + \
+          f"({number_of_members / duration:,.0f} rows/s)")
+
+
+if __name__ == "__main__":
+    main()
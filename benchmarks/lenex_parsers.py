@@ -0,0 +1,36 @@
+'''
+Benchmark of the lef parser backends available on this machine: parsing into a
+tree and extracting the results from the tree.
+Run from the repository root: python -m benchmarks.lenex_parsers <lef path>
+'''
+
+import sys
+import time
+import logging
+
+from lib.lenex_parsers import get_backends, parse_lef
+from lib.meet_management import MeetResults
+
+def main():
+    '''Main'''
+    if len(sys.argv) < 2:
+        raise ValueError("Usage: python -m benchmarks.lenex_parsers <lef path>")
+    lef_path = sys.argv[1]
+    log = logging.getLogger("benchmark")
+
+    for backend in get_backends():
+        start = time.perf_counter()
+        root = parse_lef(lef_path, backend)
+        parse_duration = time.perf_counter() - start
+
+        start = time.perf_counter()
+        meet_results = MeetResults(log, root)
+        meet_results.extract_results()
+        extract_duration = time.perf_counter() - start
+
+        print(f"{backend:6s} tree: {parse_duration:.3f}s, " + \
+              f"extract {len(meet_results.result_ids)} results: {extract_duration:.3f}s")
+
+
+if __name__ == "__main__":
+    main()
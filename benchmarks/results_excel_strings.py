@@ -0,0 +1,57 @@
+'''
+Benchmark of the string strategies of the results excel on a synthetic large meet.
+Compares the file size and the time to close the workbook for the xlsxwriter
+workbook (shared strings) and the parallel writer (inline or hybrid strings),
+with and without numeric placings.
+Run from the repository root: python -m benchmarks.results_excel_strings
+'''
+
+import os
+import time
+import random
+import logging
+
+from lib.meet_management import RankingsEntry
+from lib.results_excel import ResultsExcel
+from lib.swim_time import SwimTime
+
+NUMBER_OF_MEETS = 4
+NUMBER_OF_EVENTS = 60
+NUMBER_OF_SWIMMERS = 800
+SWIMMERS_PER_EVENT = 120
+
+def create_rankings(rng: random.Random) -> dict[str, list[RankingsEntry]]:
+    '''Rankings of one meet, every swimmer swims multiple events'''
+    swimmers = [f"Swimmer{i:04d} Lastname{i % 97:02d}" for i in range(NUMBER_OF_SWIMMERS)]
+    rankings = {}
+    for event_number in range(NUMBER_OF_EVENTS):
+        entries = sorted(rng.sample(swimmers, SWIMMERS_PER_EVENT))
+        rankings[f"Event {event_number + 1}, 100m Freestyle, Girls 12 - 13"] = [
+            RankingsEntry(placing, SwimTime(6000 + placing * 37), name, "BEL", "Club")
+            for placing, name in enumerate(entries, 1)]
+    return rankings
+
+def main():
+    '''Main'''
+    log = logging.getLogger("benchmark")
+    rng = random.Random(42)
+    meets = [create_rankings(rng) for _ in range(NUMBER_OF_MEETS)]
+
+    for parallel in (False, True):
+        for compact in (False, True):
+            name = f"bench_strings_{'parallel' if parallel else 'xlsxwriter'}" + \
+                   f"{'_compact' if compact else ''}"
+            results_excel = ResultsExcel(log, name, parallel=parallel, compact=compact)
+            for meet_number, rankings in enumerate(meets):
+                results_excel.add_results_to_excel(rankings, {}, f"Meet {meet_number}")
+
+            start = time.perf_counter()
+            results_excel.close()
+            duration = time.perf_counter() - start
+
+            size = os.path.getsize(results_excel.file_path)
+            print(f"{name:35} close {duration:6.3f}s  size {size / 1024:8.1f} KiB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+'''
+Benchmark of the summary sheet modes on a synthetic club. Reports the time to
+generate the overview and summary sheets, the file size and, as a measure of the
+recalculation cost in excel, the number of formulas and the number of cells they
+reference.
+Run from the repository root: python -m benchmarks.summary_sheet_formulas <lef path> <logo path>
+'''
+
+import os
+import sys
+import time
+import re
+import random
+import logging
+import zipfile
+import xml.etree.ElementTree as ET
+
+from xlsxwriter.utility import xl_cell_to_rowcol
+
+from lib.club_management import Club, Swimmer
+from lib.meet_management import SwimMeet
+from lib.registration_excel import RegistrationExcel
+
+NUMBER_OF_SWIMMERS = 400
+GROUPS = ["Groep A", "Groep B", "Groep C", "Groep D"]
+MAIN_NS = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+RANGE_PATTERN = re.compile(r"!([A-Z]+[0-9]+):([A-Z]+[0-9]+)")
+
+def create_club(log: logging.Logger, rng: random.Random) -> Club:
+    '''Club with random swimmers equally spread over the groups'''
+    club = Club(log, "Benchmark")
+    for number in range(NUMBER_OF_SWIMMERS):
+        group = GROUPS[number % len(GROUPS)]
+        club.members.setdefault(group, []).append(
+            Swimmer(f"First{number} Last{number}", f"05/01/{rng.randint(5, 14):02d}",
+                    rng.choice("12"), group, f"First{number}", f"Last{number}"))
+    return club
+
+def count_formula_cells(file_path: str) -> tuple[int, int]:
+    '''Number of formulas in the summary sheet and the cells they reference'''
+    with zipfile.ZipFile(file_path) as zipped_file:
+        # Sheets in order: overview, (hidden) metadata, summary
+        summary_xml = zipped_file.read("xl/worksheets/sheet3.xml")
+
+    number_of_formulas = 0
+    referenced_cells = 0
+    for formula in ET.fromstring(summary_xml).iter(f"{{{MAIN_NS}}}f"):
+        number_of_formulas += 1
+        for first, last in RANGE_PATTERN.findall(formula.text.replace("$", "")):
+            first_row, first_col = xl_cell_to_rowcol(first)
+            last_row, last_col = xl_cell_to_rowcol(last)
+            referenced_cells += (last_row - first_row + 1) * (last_col - first_col + 1)
+
+    return number_of_formulas, referenced_cells
+
+def main():
+    '''Main'''
+    if len(sys.argv) != 3:
+        raise ValueError("Usage: python -m benchmarks.summary_sheet_formulas " + \
+                         "<lef path> <logo path>")
+
+    log = logging.getLogger("benchmark")
+    meet = SwimMeet(log)
+    meet.load_from_xml(ET.parse(sys.argv[1]).getroot())
+    club = create_club(log, random.Random(42))
+
+    for dynamic_summary in (False, True):
+        registration_excel = RegistrationExcel(log, f"bench_summary_{dynamic_summary}",
+                                               sys.argv[2], dynamic_summary=dynamic_summary)
+        registration_excel.groups_to_use = GROUPS
+
+        start = time.perf_counter()
+        registration_excel.add_overview_registration_sheet(meet, club)
+        registration_excel.add_summary_sheet(meet, club)
+        registration_excel.close()
+        duration = time.perf_counter() - start
+
+        number_of_formulas, referenced_cells = count_formula_cells(registration_excel.file_path)
+        size = os.path.getsize(registration_excel.file_path)
+        print(f"dynamic_summary={dynamic_summary!s:5}  generate {duration:6.3f}s  " + \
+              f"size {size / 1024:7.1f} KiB  formulas {number_of_formulas:4}  " + \
+              f"referenced cells {referenced_cells}")
+
+
+if __name__ == "__main__":
+    main()
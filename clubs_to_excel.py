@@ -0,0 +1,63 @@
+'''
+Create the registration excels of multiple clubs (e.g. for a federation) for the
+same meet. Every club is a team manager mdb or members csv in the selected folder,
+named after the club (its code in the results lenexes). A <club name>.png next to
+it is used as the club logo.
+'''
+
+import glob
+import os
+
+from easygui import diropenbox
+
+from settings import Settings
+from lib.clubs import Clubs
+from lib.meet_management import SwimMeet, LenexHelper
+from lib.results_database import ResultsDatabase
+
+def create_club_excels(settings: Settings, log) -> None:
+    '''Write a registration excel with all the groups of every club in the selected folder'''
+    members_dir = diropenbox(title="Select the folder with the members of the clubs")
+    if members_dir is None:
+        raise ValueError("Invalid folder selected")
+
+    members_paths = {os.path.splitext(os.path.basename(path))[0]: path
+                     for path in sorted(glob.glob(os.path.join(members_dir, "*.mdb")) + \
+                                        glob.glob(os.path.join(members_dir, "*.csv")))}
+    log.info(f"Found the members of {len(members_paths)} clubs")
+
+    clubs = Clubs(log)
+    clubs.load_members(members_paths)
+
+    # Load in the competition lenex, shared by all the clubs
+    lenex = LenexHelper(log, settings.default_competition_path)
+    lenex.load_lenex()
+    lenex.extract_lef_from_lenex()
+    lenex.load_xml_from_lef(settings.parser_backend)
+
+    meet = SwimMeet(log)
+    meet.load_from_xml(lenex.xml_root)
+
+    # The members are named after the club code in the results lenexes
+    database = ResultsDatabase(log)
+    best_times = {club_name: database.get_personal_bests(club_name) for club_name in clubs.clubs}
+    database.close()
+    if not any(best_times.values()):
+        best_times = None
+
+    groups = {club_name: club.get_groups() for club_name, club in clubs.clubs.items()}
+    club_logo_paths = {}
+    for club_name in clubs.clubs:
+        logo_path = os.path.join(members_dir, f"{club_name}.png")
+        club_logo_paths[club_name] = logo_path if os.path.exists(logo_path) \
+                                     else settings.club_logo_path
+
+    clubs.write_registration_excels(meet, groups, club_logo_paths, best_times)
+
+def main():
+    '''Main'''
+    create_club_excels(Settings.init_settings(), Settings.get_logger())
+
+
+if __name__ == "__main__":
+    main()
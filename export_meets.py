@@ -0,0 +1,39 @@
+'''
+Export all the results lenexes of a folder (e.g. a full season) to columnar
+files (Parquet, or csv without pyarrow) for analysis
+'''
+
+import glob
+import os
+
+from easygui import diropenbox
+
+from settings import Settings
+from lib.meet_management import LenexHelper
+from lib.lenex_index import load_meet_results
+from lib.columnar_export import ColumnarExport
+
+def export_meets(log, export_format: str = "parquet") -> None:
+    '''Export the events, athletes, results, splits and rankings of every lenex'''
+    lenex_dir = diropenbox(title="Select the folder with the results lenexes")
+    if lenex_dir is None:
+        raise ValueError("Invalid folder selected")
+
+    export = ColumnarExport(log, "tmp/export", export_format)
+    for lenex_path in sorted(glob.glob(os.path.join(lenex_dir, "*.lxf"))):
+        lenex = LenexHelper(log, lenex_dir)
+        lenex.load_lenex(lenex_path)
+        lenex.extract_lef_from_lenex()
+
+        for meet_results in load_meet_results(log, lenex.get_lef_path(), [],
+                                              backend=Settings.get_parser_backend()):
+            export.add_meet(meet_results)
+    export.close()
+
+def main():
+    '''Main'''
+    export_meets(Settings.get_logger())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,37 @@
+'''
+Import the results lenex of an interclub meet, score the clubs on the placings of
+their swimmers and relays and put the rankings and the standings into an excel
+'''
+
+from settings import Settings
+from lib.meet_management import LenexHelper
+from lib.lenex_index import load_meet_results
+from lib.results_excel import ResultsExcel
+from lib.interclub import InterclubScores, ScoringRules
+
+def create_interclub_excel(log, placing_points: str = "9-7-6-5-4-3-2-1",
+                           relay_multiplier: int = 2) -> None:
+    '''Score all the meets of the selected lenex and write the standings'''
+    lenex = LenexHelper(log, "C:/Users/brabo/Lenex_register-Excel-Generator/")
+    lenex.load_lenex()
+    lenex.extract_lef_from_lenex()
+
+    scores = InterclubScores(log, ScoringRules.from_string(placing_points, relay_multiplier))
+    results_excel = ResultsExcel(log, "INTERCLUB")
+    for meet_results in load_meet_results(log, lenex.get_lef_path(), [],
+                                          backend=Settings.get_parser_backend()):
+        scores.add_meet(meet_results)
+        results_excel.add_results_to_excel(meet_results.results,
+                                           meet_results.results_relays,
+                                           meet_results.meet_name)
+
+    results_excel.add_interclub_standings(scores)
+    results_excel.close()
+
+def main():
+    '''Main'''
+    create_interclub_excel(Settings.get_logger())
+
+
+if __name__ == "__main__":
+    main()
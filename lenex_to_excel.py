@@ -6,6 +6,14 @@ from settings import Settings
 from lib.club_management import Club
 from lib.meet_management import SwimMeet, LenexHelper
 from lib.registration_excel import RegistrationExcel
+from lib.results_database import ResultsDatabase
+
+# Cross out the invalid events of the overview with a single conditional format
+# instead of styling every cell, a smaller excel for big meets (hatched, not crossed)
+CONDITIONAL_CROSS = False
+# Summarise all the swimmers with a single BYROW formula instead of a formula per
+# swimmer, needs an Excel with dynamic arrays (Excel 365/2021)
+DYNAMIC_SUMMARY = False
 
 def main() -> None:
     '''Main to load setting, create a club, load in the competition and create the excel'''
@@ -21,14 +29,21 @@ def main() -> None:
     lenex = LenexHelper(log, settings.default_competition_path)
     lenex.load_lenex()
     lenex.extract_lef_from_lenex()
-    lenex.load_xml_from_lef()
+    lenex.load_xml_from_lef(settings.parser_backend)
 
     # Construct a swim meet from the xml
     meet = SwimMeet(log)
     meet.load_from_xml(lenex.xml_root)
 
+    # Personal bests of earlier ingested results, used to check the limit times
+    database = ResultsDatabase(log)
+    best_times = database.get_personal_bests() or None
+    database.close()
+
     # Create the registration excel
-    excel = RegistrationExcel(log, meet.meet_name, settings.club_logo_path)
+    excel = RegistrationExcel(log, meet.meet_name, settings.club_logo_path, best_times,
+                              conditional_cross=CONDITIONAL_CROSS,
+                              dynamic_summary=DYNAMIC_SUMMARY)
     excel.add_overview_registration_sheet(meet, club)
     excel.add_summary_sheet(meet, club)
     excel.add_valid_events_sheet(meet, club)
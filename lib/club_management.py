@@ -4,10 +4,14 @@ the groups, athletes
 '''
 from dataclasses import dataclass
 from datetime import datetime
+from operator import itemgetter
+from typing import Iterator
 
 import re
 import os
+import sys
 import csv
+import tempfile
 import subprocess
 import logging
 
@@ -18,6 +22,8 @@ class Swimmer:
     birth_data: str
     gender: str
     group: str
+    first_name: str = ""
+    last_name: str = ""
 
     def get_age_at(self, date_str: str) -> int:
         '''Get the age of a swimmer at a certain point in
@@ -36,6 +42,24 @@ class Swimmer:
 
         return meet_year_short - birth_year_short
 
+    def get_birth_date_iso(self) -> str:
+        '''Get the birth date as yyyy-mm-dd (lenex format). Expect birth_data
+           as mm/dd/yy, the default date format of mdb-export, or mm/dd/yyyy'''
+        month, day, year = self.birth_data.split("/")
+        if len(year) == 4:
+            return f"{year}-{int(month):02d}-{int(day):02d}"
+        year_short = int(year[-2:])
+        current_year_short = datetime.now().year % 100
+
+        # A two digit year in the future is from the previous century
+        century = 2000 if year_short <= current_year_short else 1900
+
+        return f"{century + year_short}-{int(month):02d}-{int(day):02d}"
+
+    def get_lenex_gender(self) -> str:
+        '''Team manager stores the gender as 1 (male) or 2 (female)'''
+        return "F" if self.gender == '2' else "M"
+
     def __str__(self):
         return self.name
 
@@ -43,75 +67,130 @@ class Swimmer:
 class Club:
     '''Container with all the data of the club and its members'''
     ACTIVE = "T"
+    # Columns of the members table that are used, in the order of the projection
+    MEMBER_COLUMNS = ("ACTIVE", "GROUPS", "FIRSTNAME", "LASTNAME", "BIRTHDATE", "GENDER")
+    # Team manager stores the genders as 1/2 and the birth dates as mm/dd/yy, other
+    # exports can use M/F and yyyy-mm-dd
+    GENDERS = {"1": "1", "2": "2", "M": "1", "F": "2"}
+    BIRTH_DATE_TEAM_MANAGER = re.compile(r"(\d{1,2})/(\d{1,2})/(\d\d|\d{4})")
+    BIRTH_DATE_ISO = re.compile(r"(\d{4})-(\d\d)-(\d\d)")
 
     def __init__(self, log: logging.Logger, name: str):
         self.members = dict()
         self.club_name = name
         self.log = log
 
-    def __fill_club_from_members_list(self, members_list: list):
-        # Get the indices of the different fields of the headers
-        index_last_name = members_list[0].index("LASTNAME")
-        index_first_name = members_list[0].index("FIRSTNAME")
-        index_gender = members_list[0].index("GENDER")
-        index_active = members_list[0].index("ACTIVE")
-        index_groups = members_list[0].index("GROUPS")
-        index_birth_date = members_list[0].index("BIRTHDATE")
+    def __get_member_birth_date(self, birth_date: str) -> str:
+        '''The birth date as mm/dd/yy(yy), None when it is not a valid date'''
+        birth_date = birth_date.split(' ', 1)[0]
+        match = self.BIRTH_DATE_TEAM_MANAGER.fullmatch(birth_date)
+        if match is not None:
+            month, day, _ = match.groups()
+        else:
+            match = self.BIRTH_DATE_ISO.fullmatch(birth_date)
+            if match is None:
+                return None
+            year, month, day = match.groups()
+            birth_date = f"{month}/{day}/{year}"
+
+        if not 1 <= int(month) <= 12 or not 1 <= int(day) <= 31:
+            return None
+
+        return birth_date
+
+    def __fill_club_from_member_rows(self, member_rows: Iterator[list[str]]):
+        '''Fill the groups in a single pass over the rows, the first row contains
+           the headers. Only the used columns are projected out of every row'''
+        headers = next(member_rows, None)
+        if headers is None:
+            raise RuntimeError("Empty members csv")
+
+        index_active, *index_others = [headers.index(column) for column in self.MEMBER_COLUMNS]
+        project = itemgetter(*index_others)
 
-        # Remove the first entry as this contains the headers
-        members_list.pop(0)
+        # Group strings (e.g. "Groep A, Groep C") are shared by many members
+        groups_cache: dict[str, tuple[str, ...]] = {}
+        number_of_rows = 0
 
-        for athlete in members_list:
+        # Row numbers as in the csv, the headers are row 1
+        for row_number, athlete in enumerate(member_rows, 2):
             # Possibility that there are empty elements
             if not athlete:
                 continue
+            number_of_rows += 1
 
-            # Do not use inactive members
+            # Do not use inactive members, before anything else is looked up
             if athlete[index_active] != self.ACTIVE:
                 continue
 
-            # Iterate over all the group of the athlete
-            for group in athlete[index_groups].split(", "):
-                # Create empty list if unkown group
-                if group not in self.members:
-                    self.members[group] = []
+            groups_str, first_name, last_name, birth_date, gender = project(athlete)
+            team_manager_birth_date = self.__get_member_birth_date(birth_date)
+            if team_manager_birth_date is None:
+                raise ValueError(f"Invalid birth date '{birth_date}' of {first_name} " + \
+                                 f"{last_name} on row {row_number} of the members, " + \
+                                 "expected mm/dd/yy or yyyy-mm-dd")
+            team_manager_gender = self.GENDERS.get(gender.strip().upper())
+            if team_manager_gender is None:
+                raise ValueError(f"Invalid gender '{gender}' of {first_name} {last_name} " + \
+                                 f"on row {row_number} of the members, expected 1/2 or M/F")
+
+            groups = groups_cache.get(groups_str)
+            if groups is None:
+                groups = tuple(sys.intern(group) for group in groups_str.split(", "))
+                groups_cache[groups_str] = groups
+                for group in groups:
+                    self.members.setdefault(group, [])
+
+            athlete_name = first_name + " " + last_name
+            for group in groups:
+                self.members[group].append(Swimmer(athlete_name, team_manager_birth_date,
+                                                   team_manager_gender, group,
+                                                   first_name, last_name))
+
+        if number_of_rows == 0:
+            raise ValueError("Members list is empty")
 
-                # Append the athlete to the correct group
-                athlete_name = f"{athlete[index_first_name]} {athlete[index_last_name]}"
-                self.members[group].append(Swimmer(athlete_name,
-                                                   athlete[index_birth_date].split(' ')[0],
-                                                   athlete[index_gender],
-                                                   group))
+        self.log.debug(f"Read {number_of_rows} members into {len(self.members)} groups")
 
-    def __read_members_from_mdb(self, mdb_path: str) -> str:
+    def __check_mdb_path(self, mdb_path: str):
         if os.path.splitext(mdb_path)[1] != '.mdb':
             raise ValueError("Given path to database is not an mdb")
 
         if os.path.exists(os.path.splitext(mdb_path)[0] + '.ldb'):
             raise RuntimeError("Database is locked")
 
-        try:
-            result = subprocess.run(['mdb-export', mdb_path, 'MEMBERS'],
-                                    capture_output=True,
-                                    text=True,
-                                    check=True)
-        except subprocess.CalledProcessError as e:
-            raise RuntimeError(f"Error extracting data from database: {e}") from e
-
-        return result.stdout
-
     def fill_using_team_manager_mdb(self, mdb_path: str):
-        '''Fill the club class using the given mdb'''
-        # Extract members from the team manager database
-        members_csv = self.__read_members_from_mdb(mdb_path)
-        if members_csv == "":
-            raise RuntimeError("Empty members csv")
-
-        members_list = list(csv.reader(members_csv.split('\n')))
-        if len(members_list) <= 1:
-            raise ValueError("Members list is empty")
-
-        self.__fill_club_from_members_list(members_list)
+        '''Fill the club class using the given mdb. The members table is parsed
+           while it is being exported'''
+        self.__check_mdb_path(mdb_path)
+
+        # The errors go to a file, a pipe that is only read at the end could fill up
+        # and block the export while the members are still being read
+        with tempfile.TemporaryFile("w+") as error_file, \
+             subprocess.Popen(['mdb-export', mdb_path, 'MEMBERS'], stdout=subprocess.PIPE,
+                              stderr=error_file, text=True) as process:
+            try:
+                self.__fill_club_from_member_rows(csv.reader(process.stdout))
+            except (RuntimeError, ValueError) as e:
+                # A failing export has no output, report the error of the export instead
+                process.communicate()
+                if process.returncode != 0:
+                    error_file.seek(0)
+                    raise RuntimeError("Error extracting data from database: " + \
+                                       error_file.read()) from e
+                raise
+            process.communicate()
+
+            if process.returncode != 0:
+                error_file.seek(0)
+                raise RuntimeError(f"Error extracting data from database: {error_file.read()}")
+
+    def fill_using_members_csv(self, csv_path: str):
+        '''Fill the club class using a csv export of the members (e.g. of a
+           federation), with at least the columns of MEMBER_COLUMNS. Birth dates
+           are mm/dd/yy or yyyy-mm-dd, genders 1/2 or M/F'''
+        with open(csv_path, newline='', encoding="utf-8-sig") as fi:
+            self.__fill_club_from_member_rows(csv.reader(fi))
 
     def get_groups(self) -> list[str]:
         '''Get all the group names in the club'''
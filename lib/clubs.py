@@ -0,0 +1,110 @@
+'''
+Contains the registry of multiple clubs (e.g. all the clubs of a federation)
+preparing the registrations for the same meet. The members of the clubs are
+loaded and the registration excels are written in worker processes.
+'''
+
+import os
+import logging
+
+from concurrent.futures import ProcessPoolExecutor
+
+from lib.club_management import Club
+from lib.meet_management import SwimMeet
+from lib.possible_events import PossibleEvents
+from lib.registration_excel import RegistrationExcel
+
+# Parsed meet and eligibility of a registration worker, set once per process
+_WORKER_STATE: dict = {}
+
+def _load_club(club_name: str, members_path: str, log_name: str) -> Club:
+    '''Worker: fill a club from a team manager mdb or a members csv'''
+    club = Club(logging.getLogger(log_name), club_name)
+    if os.path.splitext(members_path)[1] == ".mdb":
+        club.fill_using_team_manager_mdb(members_path)
+    else:
+        club.fill_using_members_csv(members_path)
+
+    return club
+
+def _init_registration_worker(meet: SwimMeet, class_events: dict):
+    '''Worker initializer: the meet is only sent once to every worker'''
+    _WORKER_STATE["meet"] = meet
+    _WORKER_STATE["class_events"] = class_events
+
+def _write_registration_excel(club: Club, groups: list[str], club_logo_path: str,
+                              best_times: dict) -> str:
+    '''Worker: write the registration excel of one club'''
+    meet: SwimMeet = _WORKER_STATE["meet"]
+
+    # The club name makes the excel name unique
+    excel = RegistrationExcel(club.log, f"{meet.meet_name} {club.club_name}", club_logo_path,
+                              best_times, class_events=_WORKER_STATE["class_events"])
+    excel.groups_to_use = sorted(groups)
+    excel.add_overview_registration_sheet(meet, club)
+    excel.add_summary_sheet(meet, club)
+    excel.add_valid_events_sheet(meet, club)
+    excel.close()
+
+    return excel.file_path
+
+class Clubs:
+    '''Registry of clubs registering for the same meet'''
+    def __init__(self, log: logging.Logger):
+        self.log = log
+        self.clubs: dict[str, Club] = {}
+
+    def load_members(self, members_paths: dict[str, str], max_workers: int = None):
+        '''Fill the clubs in parallel, members_paths maps the club name on its team
+           manager mdb or members csv'''
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            futures = {club_name: executor.submit(_load_club, club_name, path, self.log.name)
+                       for club_name, path in members_paths.items()}
+
+            for club_name, future in futures.items():
+                self.clubs[club_name] = future.result()
+
+        self.log.info(f"Loaded the members of {len(self.clubs)} clubs")
+
+    def get_class_events(self, meet: SwimMeet,
+                         groups: dict[str, list[str]]) -> dict[tuple[str, int], tuple[list, list]]:
+        '''Get the (valid, invalid) events of every (gender, age) class of
+           the swimmers of all the clubs, every class is only checked once'''
+        class_events = {}
+        for club_name, club_groups in groups.items():
+            possible_events = PossibleEvents(meet, self.clubs[club_name],
+                                             class_events=class_events)
+            for group in club_groups:
+                for swimmer in self.clubs[club_name].get_swimmers_from_group(group):
+                    possible_events.get_class_events(swimmer.gender,
+                                                     swimmer.get_age_at(meet.age_date))
+
+        self.log.debug(f"{len(class_events)} gender/age classes for {len(groups)} clubs")
+
+        return class_events
+
+    def write_registration_excels(self, meet: SwimMeet, groups: dict[str, list[str]],
+                                  club_logo_paths: dict[str, str], best_times: dict = None,
+                                  max_workers: int = None) -> list[str]:
+        '''Write a registration excel for every club in groups, with the given groups
+           of that club. The best times are per club (club name -> best times of its
+           swimmers), swimmers with the same name in other clubs are not mixed up.
+           Return the paths of the excels'''
+        unknown_clubs = set(groups) - set(self.clubs)
+        if unknown_clubs:
+            raise ValueError(f"Unknown clubs: {', '.join(sorted(unknown_clubs))}")
+
+        class_events = self.get_class_events(meet, groups)
+
+        with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_registration_worker,
+                                 initargs=(meet, class_events)) as executor:
+            futures = [executor.submit(_write_registration_excel, self.clubs[club_name],
+                                       club_groups, club_logo_paths[club_name],
+                                       None if best_times is None else
+                                       best_times.get(club_name, {}))
+                       for club_name, club_groups in groups.items()]
+            excel_paths = [future.result() for future in futures]
+
+        self.log.info(f"Written {len(excel_paths)} registration excels")
+
+        return excel_paths
@@ -0,0 +1,166 @@
+'''
+Contains the columnar export of parsed meets: the events, athletes, results,
+splits and rankings are written as tables for analysis outside of excel. With
+pyarrow installed the tables are Parquet files or Arrow IPC streams, strings
+dictionary encoded. Without pyarrow, or when asked for, csv files are written.
+'''
+
+import os
+import csv
+import logging
+
+from lib.meet_management import MeetResults
+from lib.swim_time import SwimTime
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+# Table name -> (column name, is string)
+TABLE_COLUMNS: dict[str, list[tuple[str, bool]]] = {
+    "events": [("meet_name", True), ("event_id", True), ("gender", True), ("stroke", True),
+               ("distance", False), ("relay_count", False), ("round", True), ("date", True)],
+    "athletes": [("meet_name", True), ("athlete_id", True), ("swimmer_name", True),
+                 ("nationality", True), ("club", True), ("birth_date", True), ("gender", True)],
+    "results": [("meet_name", True), ("result_id", True), ("athlete_id", True),
+                ("event_id", True), ("swim_time", False), ("status", True)],
+    "splits": [("meet_name", True), ("result_id", True), ("distance", False),
+               ("swim_time", False)],
+    "rankings": [("meet_name", True), ("ranking", True), ("relay", False), ("placing", False),
+                 ("swim_time", False), ("swimmer_name", True), ("club", True)],
+}
+
+def _hundredths(swim_time: SwimTime) -> int:
+    # A plain int, SwimTime is formatted as a time in csv
+    return None if swim_time is None else int(swim_time)
+
+class ColumnarExport:
+    '''Write the tables of one or more meets to a folder, one file per table.
+       Rows are buffered per column and written per batch of batch_size rows.
+       Swim times are integer hundredths, empty (null) without a time'''
+    FORMATS = ("parquet", "arrow", "csv")
+    EXTENSIONS = {"parquet": "parquet", "arrow": "arrows", "csv": "csv"}
+
+    def __init__(self, log: logging.Logger, export_dir: str, export_format: str = "parquet",
+                 batch_size: int = 65536):
+        if export_format not in self.FORMATS:
+            raise ValueError(f"Unknown export format {export_format}")
+
+        self.log = log
+        self.export_dir = export_dir
+        self.batch_size = batch_size
+
+        self.export_format = export_format
+        if export_format != "csv" and pa is None:
+            self.log.warning("pyarrow is not installed, exporting as csv")
+            self.export_format = "csv"
+
+        if not os.path.isdir(export_dir):
+            os.makedirs(export_dir)
+
+        self.__columns: dict[str, list[list]] = {table: [[] for _ in columns]
+                                                 for table, columns in TABLE_COLUMNS.items()}
+        self.__writers: dict[str, object] = {}
+        self.__files: dict[str, object] = {}
+        self.number_of_rows: dict[str, int] = dict.fromkeys(TABLE_COLUMNS, 0)
+
+    def get_path(self, table: str) -> str:
+        '''Path of the file of a table'''
+        return os.path.join(self.export_dir,
+                            f"{table}.{self.EXTENSIONS[self.export_format]}")
+
+    def __get_schema(self, table: str):
+        return pa.schema([(name, pa.dictionary(pa.int32(), pa.string()) if is_string
+                           else pa.int32()) for name, is_string in TABLE_COLUMNS[table]])
+
+    def __open_writer(self, table: str):
+        path = self.get_path(table)
+        if self.export_format == "csv":
+            self.__files[table] = open(path, "w", newline="", encoding="utf-8")
+            writer = csv.writer(self.__files[table])
+            writer.writerow([name for name, _ in TABLE_COLUMNS[table]])
+        elif self.export_format == "parquet":
+            writer = pq.ParquetWriter(path, self.__get_schema(table))
+        else:
+            # The stream format allows other dictionaries in every batch
+            writer = pa.ipc.new_stream(path, self.__get_schema(table))
+
+        self.__writers[table] = writer
+        return writer
+
+    def __flush(self, table: str):
+        columns = self.__columns[table]
+        if not columns[0]:
+            return
+
+        writer = self.__writers.get(table) or self.__open_writer(table)
+        if self.export_format == "csv":
+            writer.writerows(zip(*columns))
+        else:
+            arrays = [pa.array(column, type=pa.string()).dictionary_encode() if is_string
+                      else pa.array(column, type=pa.int32())
+                      for column, (_, is_string) in zip(columns, TABLE_COLUMNS[table])]
+            batch = pa.record_batch(arrays, schema=self.__get_schema(table))
+            if self.export_format == "parquet":
+                writer.write_table(pa.Table.from_batches([batch]))
+            else:
+                writer.write_batch(batch)
+
+        self.number_of_rows[table] += len(columns[0])
+        for column in columns:
+            column.clear()
+
+    def __add_row(self, table: str, row: tuple):
+        columns = self.__columns[table]
+        for column, value in zip(columns, row):
+            column.append(value)
+
+        if len(columns[0]) >= self.batch_size:
+            self.__flush(table)
+
+    def add_meet(self, meet_results: MeetResults):
+        '''Add all the tables of a meet, the rankings are the constructed rankings'''
+        meet_results.extract_results()
+        meet_name = meet_results.meet_name
+
+        for event_id, event in meet_results.event_ids.items():
+            self.__add_row("events", (meet_name, event_id, event.gender, event.stroke,
+                                      event.distance, event.relay_count, event.event_round,
+                                      event.date))
+
+        for athlete_id, athlete in meet_results.athlete_ids.items():
+            self.__add_row("athletes", (meet_name, athlete_id, athlete.swimmer_name,
+                                        athlete.nationality, athlete.club, athlete.birth_date,
+                                        athlete.gender))
+
+        for result_id, result in meet_results.result_ids.items():
+            self.__add_row("results", (meet_name, result_id, result.athlete_id, result.event_id,
+                                       _hundredths(result.swim_time), result.status))
+
+        for result_id, distance, swim_time in meet_results.splits.iter_splits():
+            self.__add_row("splits", (meet_name, result_id, distance, swim_time))
+
+        for relay, rankings in [(0, meet_results.results), (1, meet_results.results_relays)]:
+            for ranking_name, ranking in rankings.items():
+                for entry in ranking:
+                    self.__add_row("rankings", (meet_name, ranking_name, relay, entry.placing,
+                                                _hundredths(entry.swim_time),
+                                                entry.swimmer_name, entry.club))
+
+        self.log.info(f"Added {meet_name} to the {self.export_format} export")
+
+    def close(self):
+        '''Write the remaining rows and close all the files'''
+        for table in TABLE_COLUMNS:
+            self.__flush(table)
+
+        for table, writer in self.__writers.items():
+            if self.export_format == "csv":
+                self.__files[table].close()
+            else:
+                writer.close()
+
+        self.log.info(f"Exported {sum(self.number_of_rows.values())} rows to {self.export_dir}")
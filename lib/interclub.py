@@ -0,0 +1,112 @@
+'''
+Contains the interclub scoring, clubs get points for the placings of their
+swimmers and relays in the rankings of MeetResults (e.g. 9-7-6-5-4-3-2-1, where
+relays count double).
+'''
+
+import logging
+
+from collections import Counter
+from dataclasses import dataclass
+
+from lib.meet_management import MeetResults, RankingsEntry
+
+@dataclass(frozen=True)
+class ScoringRules:
+    '''Points per placing, starting from the first place. Tied swimmers all get
+       the points of their shared placing'''
+    placing_points: tuple[int, ...] = (9, 7, 6, 5, 4, 3, 2, 1)
+    relay_multiplier: int = 2
+    # Only the best swimmers/relays of a club in an event score, 0 is no limit
+    scorers_per_club: int = 0
+
+    @classmethod
+    def from_string(cls, placing_points: str, relay_multiplier: int = 2,
+                    scorers_per_club: int = 0) -> "ScoringRules":
+        '''Create the rules from placing points written as 9-7-6-5-4-3-2-1'''
+        try:
+            points = tuple(int(p) for p in placing_points.split("-"))
+        except ValueError as e:
+            raise ValueError(f"Invalid placing points {placing_points}") from e
+
+        return cls(points, relay_multiplier, scorers_per_club)
+
+    def get_points(self, placing: int, relay: bool) -> int:
+        '''Points of a placing, 0 outside the scoring placings'''
+        if placing < 1 or placing > len(self.placing_points):
+            return 0
+
+        points = self.placing_points[placing-1]
+        return points * self.relay_multiplier if relay else points
+
+class InterclubScores:
+    '''Totals per club, per club and gender and per club and age group. Every event
+       can be (re)added on its own, so the standings can be updated after every event'''
+    def __init__(self, log: logging.Logger, rules: ScoringRules = ScoringRules()):
+        self.log = log
+        self.rules = rules
+
+        self.totals: Counter[str] = Counter()
+        self.gender_totals: Counter[tuple[str, str]] = Counter()
+        self.age_group_totals: Counter[tuple[str, str]] = Counter()
+        # (meet name, ranking name) -> the (club, points) it contributed, to replace
+        # an event. Meets of a multi meet lenex can have events with the same name
+        self.__event_points: dict[tuple[str, str], list[tuple[str, int]]] = {}
+        self.__event_classes: dict[tuple[str, str], tuple[str, str]] = {}
+
+    def __remove_event(self, event_key: tuple[str, str]):
+        gender, age_group = self.__event_classes.pop(event_key)
+        for club, points in self.__event_points.pop(event_key):
+            self.totals[club] -= points
+            self.gender_totals[(club, gender)] -= points
+            self.age_group_totals[(club, age_group)] -= points
+
+    def add_event(self, meet_name: str, event_name: str, ranking: list[RankingsEntry],
+                  event_result: MeetResults.EventResult):
+        '''Score the ranking of an event, replacing earlier scores of the same event
+           of the same meet'''
+        event_key = (meet_name, event_name)
+        if event_key in self.__event_points:
+            self.__remove_event(event_key)
+
+        scorers = Counter()
+        event_points = []
+        for entry in ranking:
+            # No points without a valid time (DSQ, DNS, ...)
+            if entry.swim_time is None or entry.status:
+                continue
+
+            scorers[entry.club] += 1
+            if 0 < self.rules.scorers_per_club < scorers[entry.club]:
+                continue
+
+            points = self.rules.get_points(entry.placing, event_result.relay)
+            if points == 0:
+                continue
+
+            event_points.append((entry.club, points))
+            self.totals[entry.club] += points
+            self.gender_totals[(entry.club, event_result.gender)] += points
+            self.age_group_totals[(entry.club, event_result.age_group)] += points
+
+        self.__event_points[event_key] = event_points
+        self.__event_classes[event_key] = (event_result.gender, event_result.age_group)
+
+    def add_meet(self, meet_results: MeetResults):
+        '''Score all the constructed rankings (individual and relays) of a meet'''
+        for rankings in [meet_results.results, meet_results.results_relays]:
+            for event_name, ranking in rankings.items():
+                self.add_event(meet_results.meet_name, event_name, ranking,
+                               meet_results.result_events[event_name])
+
+        self.log.info(f"Scored {len(self.__event_points)} events of {len(self.totals)} clubs")
+
+    def get_standings(self) -> list[tuple[int, str, int]]:
+        '''(place, club, total) sorted on total, equal totals share a place'''
+        standings = []
+        for index, (club, total) in enumerate(sorted(self.totals.items(),
+                                                     key=lambda item: (-item[1], item[0]))):
+            place = standings[-1][0] if standings and standings[-1][2] == total else index + 1
+            standings.append((place, club, total))
+
+        return standings
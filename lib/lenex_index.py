@@ -0,0 +1,358 @@
+'''
+Contains the byte offset index over an extracted lef. The lef is memory mapped
+and the start/end of elements are located without parsing the xml, such that
+parts of the document (e.g. one meet of a multi meet lenex, or the results of a
+single club) can be parsed on their own, possibly in another process.
+'''
+
+import os
+import re
+import mmap
+import pickle
+import logging
+
+from concurrent.futures import ProcessPoolExecutor
+from xml.sax.saxutils import unescape
+
+import xml.etree.ElementTree as ET
+
+from lib.meet_management import SwimMeet, MeetResults
+from lib.lenex_parsers import parse_lef_bytes
+
+class LenexIndex:
+    '''Byte ranges of the elements in a memory mapped lef. The ranges of the meets,
+       clubs and athletes are saved next to the lef (lef path + .index), such that
+       other processes and later runs do not have to scan the lef again'''
+    INDEX_VERSION = 1
+    # Bytes that can follow the tag name in a start tag
+    TAG_NAME_END = b" >/\t\r\n"
+    # Start tags of the athletes and their results in an ATHLETES element
+    ATHLETE_RESULT_TAGS = re.compile(rb"<(ATHLETE|RESULT)(?=[\s/>])[^>]*>")
+    XML_DECLARATION = re.compile(rb"(?:\xef\xbb\xbf)?\s*(<\?xml[^>]*\?>)")
+    XML_ENCODING = re.compile(rb"encoding\s*=\s*[\"']([A-Za-z0-9._-]+)[\"']")
+
+    def __init__(self, log: logging.Logger, lef_path: str, backend: str = "etree"):
+        self.log = log
+        self.lef_path = lef_path
+        # Parser backend of the parts, see lib/lenex_parsers.py
+        self.backend = backend
+
+        with open(lef_path, "rb") as fi:
+            self.mapped_lef = mmap.mmap(fi.fileno(), 0, access=mmap.ACCESS_READ)
+
+        # The parsed parts get the declaration of the lef, lefs are not always utf-8
+        declaration = self.XML_DECLARATION.match(self.mapped_lef)
+        self.xml_declaration = b"" if declaration is None else declaration.group(1)
+        encoding = self.XML_ENCODING.search(self.xml_declaration)
+        self.encoding = "utf-8" if encoding is None else encoding.group(1).decode("ascii")
+
+        stat = os.stat(lef_path)
+        self.__index_key = (self.INDEX_VERSION, stat.st_size, stat.st_mtime_ns)
+        self.meet_ranges: list[tuple[int, int]] = []
+        self.time_standards_range: tuple[int, int] = None
+        # meet index -> range of the CLUBS element (None without clubs) and
+        # club code -> ranges of the CLUB elements, built on first use
+        self.clubs_ranges: list[tuple[int, int]] = None
+        self.club_ranges: list[dict[str, list[tuple[int, int]]]] = None
+        # CLUB range -> ranges of its ATHLETE elements
+        self.athlete_ranges: dict[tuple[int, int], list[tuple[int, int]]] = None
+
+        if not self.__load_index():
+            self.meet_ranges = self.find_ranges(b"MEET")
+            time_standards_ranges = self.find_ranges(b"TIMESTANDARDLISTS")
+            self.time_standards_range = time_standards_ranges[0] if time_standards_ranges \
+                                        else None
+            self.__save_index()
+
+        self.log.debug(f"Found {len(self.meet_ranges)} meets in {lef_path}")
+
+    def get_index_path(self) -> str:
+        '''Path of the saved index of the lef'''
+        return f"{self.lef_path}.index"
+
+    def __load_index(self) -> bool:
+        '''Use the saved index if it was made of this version of the lef'''
+        try:
+            with open(self.get_index_path(), "rb") as fi:
+                index = pickle.load(fi)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            return False
+
+        if index.get("key") != self.__index_key:
+            return False
+
+        self.meet_ranges = index["meet_ranges"]
+        self.time_standards_range = index["time_standards_range"]
+        self.clubs_ranges = index["clubs_ranges"]
+        self.club_ranges = index["club_ranges"]
+        self.athlete_ranges = index["athlete_ranges"]
+        return True
+
+    def __save_index(self):
+        '''Replace the saved index, other processes only see a complete index'''
+        index_path = self.get_index_path()
+        partial_path = f"{index_path}.{os.getpid()}.partial"
+        try:
+            with open(partial_path, "wb") as fo:
+                pickle.dump({"key": self.__index_key, "meet_ranges": self.meet_ranges,
+                             "time_standards_range": self.time_standards_range,
+                             "clubs_ranges": self.clubs_ranges, "club_ranges": self.club_ranges,
+                             "athlete_ranges": self.athlete_ranges}, fo)
+            os.replace(partial_path, index_path)
+        except OSError as e:
+            # E.g. a read only folder, the index is only kept in memory
+            self.log.debug(f"Could not save the index of {self.lef_path}: {e}")
+
+    def build_club_index(self):
+        '''Index the clubs and athletes of all the meets, unless the (saved) index
+           already has them'''
+        if self.club_ranges is not None:
+            return
+
+        self.clubs_ranges = []
+        self.club_ranges = []
+        self.athlete_ranges = {}
+        for meet_range in self.meet_ranges:
+            clubs_ranges = self.find_ranges(b"CLUBS", *meet_range)
+            self.clubs_ranges.append(clubs_ranges[0] if clubs_ranges else None)
+            club_ranges = {} if not clubs_ranges else \
+                          self.find_ranges_by_attribute(b"CLUB", b"code", *clubs_ranges[0])
+            self.club_ranges.append(club_ranges)
+
+            for ranges in club_ranges.values():
+                for club_range in ranges:
+                    # Relays can have athletes in their positions, only ATHLETES counts
+                    self.athlete_ranges[club_range] = [
+                        athlete_range
+                        for athletes_range in self.find_ranges(b"ATHLETES", *club_range)
+                        for athlete_range in self.find_ranges(b"ATHLETE", *athletes_range)]
+
+        self.__save_index()
+        self.log.debug(f"Indexed {len(self.athlete_ranges)} clubs of {self.lef_path}")
+
+    def find_ranges(self, tag: bytes, start: int = 0, end: int = None) -> list[tuple[int, int]]:
+        '''Get the (start, end) byte offsets of all the elements with the given tag
+           between start and end. Elements with the same tag can not be nested'''
+        if end is None:
+            end = len(self.mapped_lef)
+
+        ranges = []
+        start_tag = b"<" + tag
+        end_tag = b"</" + tag + b">"
+        position = self.mapped_lef.find(start_tag, start, end)
+        while position != -1:
+            tag_name_end = position + len(start_tag)
+            # Skip tags that only start with the given tag, e.g. MEETS for MEET
+            if self.mapped_lef[tag_name_end:tag_name_end+1] not in self.TAG_NAME_END:
+                position = self.mapped_lef.find(start_tag, tag_name_end, end)
+                continue
+
+            start_tag_end = self.mapped_lef.find(b">", tag_name_end, end)
+            if self.mapped_lef[start_tag_end-1:start_tag_end] == b"/":
+                # Self closing element
+                element_end = start_tag_end + 1
+            else:
+                element_end = self.mapped_lef.find(end_tag, start_tag_end, end)
+                if element_end == -1:
+                    raise ValueError(f"No end tag for {tag.decode()} at byte {position}")
+                element_end += len(end_tag)
+
+            ranges.append((position, element_end))
+            position = self.mapped_lef.find(start_tag, element_end, end)
+
+        return ranges
+
+    def find_ranges_by_attribute(self, tag: bytes, attribute: bytes, start: int = 0,
+                                 end: int = None) -> dict[str, list[tuple[int, int]]]:
+        '''Get the byte ranges of the elements with the given tag, grouped on the
+           value of an attribute of the element'''
+        attribute_pattern = re.compile(rb'\s' + attribute + rb'\s*=\s*(?:"([^"]*)"|\'([^\']*)\')')
+
+        ranges: dict[str, list[tuple[int, int]]] = {}
+        for byte_range in self.find_ranges(tag, start, end):
+            start_tag_end = self.mapped_lef.find(b">", byte_range[0], byte_range[1])
+            match = attribute_pattern.search(self.mapped_lef, byte_range[0], start_tag_end)
+            value = "" if match is None else \
+                    unescape((match.group(1) or match.group(2) or b"").decode(self.encoding))
+            ranges.setdefault(value, []).append(byte_range)
+
+        return ranges
+
+    def get_club_ranges(self, meet_index: int) -> dict[str, list[tuple[int, int]]]:
+        '''Get the byte ranges of the CLUB elements of a meet, on club code'''
+        self.build_club_index()
+        return self.club_ranges[meet_index]
+
+    def get_athlete_ranges(self, club_range: tuple[int, int]) -> list[tuple[int, int]]:
+        '''Get the byte ranges of the ATHLETE elements of a club'''
+        self.build_club_index()
+        return self.athlete_ranges.get(club_range, [])
+
+    def get_bytes(self, byte_range: tuple[int, int]) -> bytes:
+        '''Get the raw xml of an element'''
+        return self.mapped_lef[byte_range[0]:byte_range[1]]
+
+    def get_meet_root(self, meet_index: int) -> ET.Element:
+        '''Parse a single meet. The returned root is a LENEX node with only that meet
+           (and the global time standards), usable by SwimMeet and MeetResults'''
+        time_standards = b"" if self.time_standards_range is None else \
+                         self.get_bytes(self.time_standards_range)
+
+        return parse_lef_bytes(self.xml_declaration + b"<LENEX>" + time_standards + \
+                               b"<MEETS>" + self.get_bytes(self.meet_ranges[meet_index]) + \
+                               b"</MEETS></LENEX>", self.backend)
+
+    def __get_empty_element(self, byte_range: tuple[int, int]) -> bytes:
+        '''The start tag of an element as an element without children'''
+        start_tag_end = self.mapped_lef.find(b">", byte_range[0], byte_range[1]) + 1
+        start_tag = self.get_bytes((byte_range[0], start_tag_end))
+        return start_tag if start_tag.endswith(b"/>") else start_tag[:-1] + b"/>"
+
+    def __get_open_tag(self, byte_range: tuple[int, int]) -> bytes:
+        '''The start tag of an element, also for an element without children'''
+        start_tag = self.__get_empty_element(byte_range)
+        return start_tag[:-2] + b">"
+
+    def __get_club_stub(self, club_range: tuple[int, int]) -> bytes:
+        '''A club with only its athletes with results and their results and its
+           relays with their results and positions, without any other children
+           (splits, entries). Enough to know the nationality and club of the results
+           in the rankings and to rank on time'''
+        athletes = []
+        for athlete_range in self.get_athlete_ranges(club_range):
+            # The start tag of the athlete, followed by those of its results
+            tags = [match.group() for match
+                    in self.ATHLETE_RESULT_TAGS.finditer(self.mapped_lef, *athlete_range)]
+            # Athletes without results are not in any ranking
+            if len(tags) < 2:
+                continue
+
+            athletes.append((tags[0][:-2] if tags[0].endswith(b"/>") else tags[0][:-1]) + \
+                            b"><RESULTS>")
+            athletes += [tag if tag.endswith(b"/>") else tag[:-1] + b"/>" for tag in tags[1:]]
+            athletes.append(b"</RESULTS></ATHLETE>")
+
+        relays = []
+        for relays_range in self.find_ranges(b"RELAYS", *club_range):
+            for relay_range in self.find_ranges(b"RELAY", *relays_range):
+                relays.append(self.__get_open_tag(relay_range) + b"<RESULTS>")
+                for result_range in self.find_ranges(b"RESULT", *relay_range):
+                    relays.append(self.__get_open_tag(result_range))
+                    relays += [self.get_bytes(positions_range) for positions_range
+                               in self.find_ranges(b"RELAYPOSITIONS", *result_range)]
+                    relays.append(b"</RESULT>")
+                relays.append(b"</RESULTS></RELAY>")
+
+        return self.__get_open_tag(club_range) + b"<ATHLETES>" + b"".join(athletes) + \
+               b"</ATHLETES><RELAYS>" + b"".join(relays) + b"</RELAYS></CLUB>"
+
+    def get_club_meet_root(self, meet_index: int, club_code: str) -> ET.Element:
+        '''Parse a single meet with the complete given club. Of the other clubs only
+           the athletes and their results are kept (see __get_club_stub), all the
+           other children of the meet (sessions, agedate, ...) are kept as is'''
+        self.build_club_index()
+        meet_start, meet_end = self.meet_ranges[meet_index]
+        if self.clubs_ranges[meet_index] is None:
+            return self.get_meet_root(meet_index)
+        clubs_start, clubs_end = self.clubs_ranges[meet_index]
+
+        clubs = []
+        for code, club_ranges in self.get_club_ranges(meet_index).items():
+            for club_range in club_ranges:
+                clubs.append(self.get_bytes(club_range) if code == club_code
+                             else self.__get_club_stub(club_range))
+
+        time_standards = b"" if self.time_standards_range is None else \
+                         self.get_bytes(self.time_standards_range)
+
+        return parse_lef_bytes(self.xml_declaration + b"<LENEX>" + time_standards + \
+                               b"<MEETS>" + self.get_bytes((meet_start, clubs_start)) + \
+                               b"<CLUBS>" + b"".join(clubs) + b"</CLUBS>" + \
+                               self.get_bytes((clubs_end, meet_end)) + b"</MEETS></LENEX>",
+                               self.backend)
+
+    def close(self):
+        '''Release the memory map'''
+        self.mapped_lef.close()
+
+def _load_swim_meet(lef_path: str, meet_index: int, log_name: str,
+                    backend: str = "etree") -> SwimMeet:
+    '''Worker: parse one meet of a (multi meet) lef'''
+    log = logging.getLogger(log_name)
+    lenex_index = LenexIndex(log, lef_path, backend)
+
+    meet = SwimMeet(log)
+    meet.load_from_xml(lenex_index.get_meet_root(meet_index))
+    lenex_index.close()
+
+    return meet
+
+def _load_meet_results(lef_path: str, meet_index: int, filters: list[str],
+                       log_name: str, club_code: str = "",
+                       birth_year_groups: list[tuple[int, int]] = None,
+                       backend: str = "etree") -> MeetResults:
+    '''Worker: parse one meet of a (multi meet) lef and construct the rankings'''
+    log = logging.getLogger(log_name)
+    lenex_index = LenexIndex(log, lef_path, backend)
+
+    # Rankings in birth year groups are computed from the results of all the clubs
+    if birth_year_groups:
+        club_code = ""
+
+    if club_code:
+        meet_results = MeetResults(log, lenex_index.get_club_meet_root(meet_index, club_code))
+    else:
+        meet_results = MeetResults(log, lenex_index.get_meet_root(meet_index))
+        if birth_year_groups:
+            meet_results.rank_in_birth_year_groups(birth_year_groups)
+    meet_results.construct_rankings(filters)
+    # Only the rankings are sent back to the main process
+    meet_results.release_xml()
+    lenex_index.close()
+
+    return meet_results
+
+def _run_per_meet(log: logging.Logger, lef_path: str, worker, worker_args: tuple,
+                  max_workers: int, index_clubs: bool = False) -> list:
+    # The workers use the index saved by the main process
+    lenex_index = LenexIndex(log, lef_path)
+    if index_clubs:
+        lenex_index.build_club_index()
+    number_of_meets = len(lenex_index.meet_ranges)
+    lenex_index.close()
+
+    # Not worth starting processes for a single meet
+    if number_of_meets == 1:
+        return [worker(lef_path, 0, *worker_args)]
+
+    log.info(f"Parsing {number_of_meets} meets of {lef_path} in parallel")
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futures = [executor.submit(worker, lef_path, meet_index, *worker_args)
+                   for meet_index in range(number_of_meets)]
+        return [future.result() for future in futures]
+
+def load_swim_meets(log: logging.Logger, lef_path: str, max_workers: int = None,
+                    backend: str = "etree") -> list[SwimMeet]:
+    '''Load every meet of a (multi meet) lef, one meet per worker process'''
+    return _run_per_meet(log, lef_path, _load_swim_meet, (log.name, backend), max_workers)
+
+def load_meet_results(log: logging.Logger, lef_path: str, filters: list[str],
+                      max_workers: int = None, club_scoped: bool = False,
+                      birth_year_groups: list[tuple[int, int]] = None,
+                      backend: str = "etree") -> list[MeetResults]:
+    '''Construct the rankings of every meet of a (multi meet) lef, one meet
+       per worker process. When club_scoped and filtering on a club (ONLY_CLUB),
+       only the results of that club are parsed completely. With birth year
+       groups, (first, last) birth year, the individual events are ranked in
+       these groups instead of the age groups of the lenex. The meets are parsed
+       with the given backend of lib/lenex_parsers.py'''
+    club_code = ""
+    if club_scoped:
+        for results_filter in filters:
+            if results_filter.startswith("ONLY_CLUB="):
+                club_code = results_filter.split("=", 1)[1]
+
+    return _run_per_meet(log, lef_path, _load_meet_results,
+                         (filters, log.name, club_code, birth_year_groups, backend),
+                         max_workers,
+                         index_clubs=club_code != "" and not birth_year_groups)
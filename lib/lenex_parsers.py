@@ -0,0 +1,45 @@
+'''
+Contains the xml parser backends for lef files. Every backend builds a tree with
+the ElementTree api, used by SwimMeet and MeetResults:
+ - etree: the C accelerated ElementTree of the standard library
+ - lxml: only when lxml is installed
+Complete lefs (competitions) and parts of lefs (meets and clubs of results, see
+lib/lenex_index.py) are parsed with the same backend.
+'''
+
+import xml.etree.ElementTree as ET
+
+try:
+    from lxml import etree as lxml_etree
+except ImportError:
+    lxml_etree = None
+
+def get_backends() -> list[str]:
+    '''The backends available on this machine'''
+    return ["etree"] + (["lxml"] if lxml_etree is not None else [])
+
+def _check_backend(backend: str):
+    if backend not in get_backends():
+        raise ValueError(f"Unknown or unavailable parser backend {backend}")
+
+def _get_lxml_parser():
+    # Comments would show up as children of the nodes
+    return lxml_etree.XMLParser(remove_comments=True, huge_tree=True)
+
+def parse_lef(lef_path: str, backend: str = "etree") -> ET.Element:
+    '''Parse a lef into a tree, the lxml tree has the same api as ElementTree'''
+    _check_backend(backend)
+
+    if backend == "lxml":
+        return lxml_etree.parse(lef_path, _get_lxml_parser()).getroot()
+
+    return ET.parse(lef_path).getroot()
+
+def parse_lef_bytes(lef_bytes: bytes, backend: str = "etree") -> ET.Element:
+    '''Parse (a part of) a lef in memory into a tree'''
+    _check_backend(backend)
+
+    if backend == "lxml":
+        return lxml_etree.fromstring(lef_bytes, _get_lxml_parser())
+
+    return ET.fromstring(lef_bytes)
@@ -0,0 +1,109 @@
+'''
+Contains the writer to create an entries lenex. The xml is generated element by
+element and written directly into the zipped lenex, without building a tree.
+'''
+
+import io
+import os
+import logging
+
+from zipfile import ZipFile, ZIP_DEFLATED
+from xml.sax.saxutils import quoteattr
+
+from lib.meet_management import SwimMeet, SwimMeetEvent
+from lib.club_management import Club, Swimmer
+
+class LenexEntriesWriter:
+    '''Write the entries of the club members into a lenex (CLUBS/ATHLETES/ENTRIES)
+       using the event ids of the given swim meet'''
+    LENEX_VERSION = "3.0"
+    CONSTRUCTOR_NAME = "ExcelGenerator"
+
+    def __init__(self, log: logging.Logger, meet: SwimMeet):
+        self.log = log
+        self.meet = meet
+        self.file_path: str = None
+
+        self.__check_tmp_dir()
+
+    def __check_tmp_dir(self):
+        # check tmp folder present
+        if not os.path.isdir("tmp"):
+            os.mkdir("tmp")
+            self.log.debug("Created tmp folder")
+
+    @staticmethod
+    def __attributes(**attributes) -> str:
+        return "".join(f" {key}={quoteattr(str(value))}" for key, value in attributes.items())
+
+    def __write_header(self, stream: io.TextIOWrapper, club: Club):
+        stream.write('<?xml version="1.0" encoding="UTF-8"?>\n')
+        stream.write(f"<LENEX{self.__attributes(version=self.LENEX_VERSION)}>\n")
+        stream.write(f"<CONSTRUCTOR{self.__attributes(name=self.CONSTRUCTOR_NAME)}>" + \
+                     "<CONTACT email=\"\"/></CONSTRUCTOR>\n")
+        stream.write("<MEETS>\n")
+        meet_attributes = self.__attributes(name=self.meet.meet_name, city=self.meet.city,
+                                            course=self.meet.course)
+        stream.write(f"<MEET{meet_attributes}>\n")
+        stream.write("<CLUBS>\n")
+        stream.write(f"<CLUB{self.__attributes(name=club.club_name)}>\n")
+        stream.write("<ATHLETES>\n")
+
+    def __write_athlete(self, stream: io.TextIOWrapper, athlete_id: int, swimmer: Swimmer,
+                        events: list[SwimMeetEvent]):
+        athlete_attributes = self.__attributes(athleteid=athlete_id,
+                                               lastname=swimmer.last_name,
+                                               firstname=swimmer.first_name,
+                                               gender=swimmer.get_lenex_gender(),
+                                               birthdate=swimmer.get_birth_date_iso())
+        stream.write(f"<ATHLETE{athlete_attributes}><ENTRIES>")
+        for event in events:
+            entry_attributes = self.__attributes(eventid=event.event_id, entrytime="NT")
+            stream.write(f"<ENTRY{entry_attributes}/>")
+        stream.write("</ENTRIES></ATHLETE>\n")
+
+    def __write_footer(self, stream: io.TextIOWrapper):
+        stream.write("</ATHLETES>\n</CLUB>\n</CLUBS>\n</MEET>\n</MEETS>\n</LENEX>\n")
+
+    def write_entries(self, club: Club, entries: dict[str, list[int]]) -> str:
+        '''Write the entries (swimmer name -> event numbers) to a zipped lenex
+           and return the path to the written file'''
+        # Events and swimmers are looked up by number/name for every entry
+        events_by_number = self.meet.events_by_number
+        swimmers_by_name: dict[str, Swimmer] = {}
+        for group in club.get_groups():
+            for swimmer in club.get_swimmers_from_group(group):
+                swimmers_by_name[swimmer.name] = swimmer
+
+        name = self.meet.meet_name.replace(' ', '-')
+        self.file_path = f"tmp/entries_{name}.lxf"
+
+        number_of_entries = 0
+        with ZipFile(self.file_path, 'w', compression=ZIP_DEFLATED) as zipped_file:
+            with zipped_file.open(f"entries_{name}.lef", 'w') as raw_stream, \
+                    io.TextIOWrapper(raw_stream, encoding="utf-8") as stream:
+                self.__write_header(stream, club)
+
+                for athlete_id, (swimmer_name, event_numbers) in enumerate(entries.items(), 1):
+                    swimmer = swimmers_by_name.get(swimmer_name)
+                    if swimmer is None:
+                        self.log.warning(f"Unknown swimmer {swimmer_name}, entries skipped")
+                        continue
+
+                    events = []
+                    for event_number in event_numbers:
+                        event = events_by_number.get(event_number)
+                        if event is None or event.event_id == "":
+                            self.log.warning(f"No event id for event {event_number}, " + \
+                                             f"entry of {swimmer_name} skipped")
+                            continue
+                        events.append(event)
+
+                    self.__write_athlete(stream, athlete_id, swimmer, events)
+                    number_of_entries += len(events)
+
+                self.__write_footer(stream)
+
+        self.log.info(f"{number_of_entries} entries written to {self.file_path}")
+
+        return self.file_path
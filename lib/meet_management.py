@@ -14,6 +14,11 @@ import xml.etree.ElementTree as ET
 
 from easygui import fileopenbox
 
+from lib.swim_time import SwimTime
+from lib.lenex_parsers import parse_lef
+from lib.splits import SplitTimes, PacingEntry
+from lib.ranking_engine import rank_results, parse_age_date, get_age, in_age_group
+
 class LenexHelper:
     '''Helper class with methods to read and extract the xml
        from the lenex'''
@@ -26,16 +31,16 @@ class LenexHelper:
         self.extracted_filename: str = None
         self.xml_root: ET.Element = None
 
-        # Create tmp folder to unzip/rename
-        if not os.path.isdir("tmp"):
-            os.mkdir("tmp")
-            self.log.debug("Created tmp folder")
+        # Create tmp folder to unzip/rename, the season workers can create it at the same time
+        os.makedirs("tmp", exist_ok=True)
 
-    def load_lenex(self):
-        '''Select the lenex using a gui file explorer'''
+    def load_lenex(self, full_path: str = None):
+        '''Select the lenex using a gui file explorer, unless a path is given'''
         # Select the lenex
-        self.full_path = fileopenbox(default=self.start_dir,
-                                title="Select competition lenex file")
+        self.full_path = full_path
+        if self.full_path is None:
+            self.full_path = fileopenbox(default=self.start_dir,
+                                    title="Select competition lenex file")
 
         if self.full_path is None:
             raise ValueError("Invalid file selected")
@@ -45,11 +50,12 @@ class LenexHelper:
 
         self.log.info(f"Selected lenex: {self.basename}")
 
-    def extract_lef_from_lenex(self):
+    def extract_lef_from_lenex(self, force: bool = False):
         '''Extract the lef from the lenex. This boils down to unzipping
-           the lenex file and placing it into tmp'''
+           the lenex file and placing it into tmp. Force when the lenex
+           could have changed since it was extracted'''
         # Check if the lef is already extracted
-        if not os.path.exists(f"tmp/{os.path.splitext(self.basename)[0]}.lef"):
+        if force or not os.path.exists(f"tmp/{os.path.splitext(self.basename)[0]}.lef"):
             # Extract the lef from the lxf
             with ZipFile(self.full_path, 'r') as zipped_file:
                 # There will only be 1 file, get the name
@@ -65,9 +71,14 @@ class LenexHelper:
 
         self.log.info(f"Lef extracted from lenex (tmp/{self.extracted_filename})")
 
-    def load_xml_from_lef(self):
-        '''Get the xml root from the previously extracted lef'''
-        self.xml_root = ET.parse(f"tmp/{self.extracted_filename}").getroot()
+    def get_lef_path(self) -> str:
+        '''Path to the previously extracted lef'''
+        return f"tmp/{self.extracted_filename}"
+
+    def load_xml_from_lef(self, backend: str = "etree"):
+        '''Get the xml root from the previously extracted lef, parsed with one
+           of the backends of lib.lenex_parsers'''
+        self.xml_root = parse_lef(self.get_lef_path(), backend)
 
         if self.xml_root.tag != "LENEX":
             raise ValueError("Extracted xml is not a lenex!")
@@ -82,6 +93,11 @@ class SwimMeetEvent:
     max_age: int
     simplified_age: str
     round: str
+    event_id: str = ""
+    distance: int = 0
+    stroke: str = ""
+    relay_count: int = 1
+    time_standard_ids: tuple[str, ...] = ()
 
     def __str__(self):
         return f"{self.round} #{self.number} {self.gender} {self.style} {self.simplified_age}"
@@ -89,8 +105,51 @@ class SwimMeetEvent:
     def __hash__(self):
         return hash(self.__str__())
 
+@dataclass
+class TimeStandard:
+    '''Limit time of a time standard list for a certain age band'''
+    list_id: str
+    standard_type: str
+    min_age: int
+    max_age: int
+    swim_time: SwimTime
+
+class TimeStandardIndex:
+    '''Time standards of a lenex indexed on (stroke, distance, course, gender)
+       such that the limits for an event can be looked up without scanning all lists'''
+
+    def __init__(self) -> None:
+        self.list_courses: dict[str, str] = {}
+        self.standards: dict[tuple[str, int, str, str], list[TimeStandard]] = {}
+
+    def add(self, stroke: str, distance: int, course: str, gender: str,
+            standard: TimeStandard):
+        '''Add the limit time of a time standard list to the index'''
+        self.list_courses[standard.list_id] = course
+        # Lists without gender apply to both
+        genders = ["M", "F"] if gender not in ["M", "F"] else [gender]
+        for g in genders:
+            self.standards.setdefault((stroke, distance, course, g), []).append(standard)
+
+    def get_standards(self, event: SwimMeetEvent, gender: str,
+                      age: int) -> list[tuple[str, TimeStandard]]:
+        '''Get the (course, standard) of all the lists referenced by the event that
+           apply to a swimmer of the given gender and age'''
+        applicable = []
+        for list_id in event.time_standard_ids:
+            course = self.list_courses.get(list_id)
+            if course is None:
+                continue
+
+            for standard in self.standards.get((event.stroke, event.distance, course, gender), []):
+                if standard.list_id == list_id and standard.min_age <= age <= standard.max_age:
+                    applicable.append((course, standard))
+
+        return applicable
+
 class SwimMeet:
-    """Class to group the information of a meet"""
+    """Class to group the information of a meet. The events are indexed once when
+       loading, the indexes hold tuples and should not be modified"""
 
     def __init__(self, log: logging.Logger) -> None:
         # General meet information
@@ -101,6 +160,17 @@ class SwimMeet:
         self.age_date = None
         self.program: dict = {}
         self.city: str = None
+        self.time_standards = TimeStandardIndex()
+
+        # Event indexes, in program order
+        self.events: tuple[SwimMeetEvent, ...] = ()
+        self.events_by_number: dict[int, SwimMeetEvent] = {}
+        self.events_by_session: dict[str, tuple[SwimMeetEvent, ...]] = {}
+        self.events_by_round: dict[str, tuple[SwimMeetEvent, ...]] = {}
+        # (gender, min age, max age) -> events
+        self.events_by_gender_age: dict[tuple[str, int, int], tuple[SwimMeetEvent, ...]] = {}
+        # Finals can not be entered, so they are left out of the registration
+        self.__entry_events_by_session: dict[str, tuple[SwimMeetEvent, ...]] = {}
 
         self.log = log
 
@@ -171,20 +241,32 @@ class SwimMeet:
             gender = "Mixed"
 
         event_round = event.attrib.get("round", "PRE")
+        event_id = event.attrib.get("eventid", "")
 
         style = ""
         age_string = ""
+        distance = 0
+        stroke = ""
+        relay_count = 1
+        time_standard_ids = []
         for event_info in event:
             if event_info.tag == "SWIMSTYLE":
                 style = self.__parse_swimstyle_node(event_info)
+                distance = int(event_info.attrib.get("distance", "0"))
+                stroke = event_info.attrib.get("stroke", "")
+                relay_count = int(event_info.attrib.get("relaycount", "1"))
             elif event_info.tag == "AGEGROUPS":
                 age_string += self.__parse_agegroups_node(event_info)
+            elif event_info.tag == "TIMESTANDARDREFS":
+                for time_standard_ref in event_info:
+                    time_standard_ids.append(time_standard_ref.attrib.get("timestandardlistid"))
 
         min_age, max_age, simplified_age = self.__simplify_age(age_string)
 
 
         return SwimMeetEvent(number, gender, style, min_age, max_age, simplified_age,
-                             event_round)
+                             event_round, event_id, distance, stroke, relay_count,
+                             tuple(time_standard_ids))
 
     def __parse_events(self, events_root: ET.Element, s: dict):
         for event in events_root:
@@ -238,33 +320,94 @@ class SwimMeet:
         for session in session_root:
             self.__parse_session(session)
 
-    def load_from_xml(self, lef_root_node: ET.Element):
-        '''Extract all the meet information from the given lef root node'''
+    def __parse_time_standard_list(self, list_node: ET.Element):
+        list_id = list_node.attrib.get("timestandardlistid", "?")
+        course = list_node.attrib.get("course", self.course)
+        gender = list_node.attrib.get("gender", "A")
+        standard_type = list_node.attrib.get("type", "DEFAULT")
+
+        min_age, max_age = 0, 99
+        time_standards_node = None
+        for node in list_node:
+            if node.tag == "AGEGROUP":
+                if node.attrib.get("agemin", "-1") != "-1":
+                    min_age = int(node.attrib["agemin"])
+                if node.attrib.get("agemax", "-1") != "-1":
+                    max_age = int(node.attrib["agemax"])
+            elif node.tag == "TIMESTANDARDS":
+                time_standards_node = node
+
+        if time_standards_node is None:
+            return
+
+        for time_standard in time_standards_node:
+            swim_time = SwimTime.from_lenex(time_standard.attrib.get("swimtime"))
+            swimstyle = time_standard.find("SWIMSTYLE")
+            if swim_time is None or swimstyle is None:
+                continue
+
+            self.time_standards.add(swimstyle.attrib.get("stroke", ""),
+                                    int(swimstyle.attrib.get("distance", "0")), course, gender,
+                                    TimeStandard(list_id, standard_type, min_age, max_age,
+                                                 swim_time))
+
+    def __parse_time_standard_lists(self, lef_root_node: ET.Element):
+        '''Time standard lists are defined globally in the lenex, events refer to them'''
+        for node in lef_root_node:
+            if node.tag == "TIMESTANDARDLISTS":
+                for list_node in node:
+                    self.__parse_time_standard_list(list_node)
+                break
+
+    def load_from_xml(self, lef_root_node: ET.Element, meet_index: int = 0):
+        '''Extract all the meet information from the given lef root node. For multi
+           meet lenexes, meet_index selects the meet (see lenex_index for all meets)'''
         # Extract all information from the xml
         meet_root = None
         for meets in lef_root_node:
-            if meets.tag == "MEETS":
-                # Meets will mostly be only 1 meet, multi meet lenex not supported
-                meet_root = meets[0]
+            if meets.tag == "MEETS" and len(meets) > meet_index:
+                meet_root = meets[meet_index]
                 break
 
         if meet_root is None:
             raise ValueError("Swimmeet could not be created from the given lenex")
 
         self.__extract_general_information(meet_root)
+        self.__parse_time_standard_lists(lef_root_node)
         self.__parse_sessions(meet_root)
-
-    def get_all_events(self) -> list[SwimMeetEvent]:
-        '''Get a list with all the events in this swim meet'''
-        return_list: list[SwimMeetEvent] = []
-        for _, events in self.program.items():
-            for event in events["events"]:
-                return_list.append(event)
-        return return_list
-
-    def get_events_in_session(self, session_name: str) -> list[SwimMeetEvent]:
+        self.__build_event_indexes()
+
+    def __build_event_indexes(self):
+        by_round: dict[str, list[SwimMeetEvent]] = {}
+        by_gender_age: dict[tuple[str, int, int], list[SwimMeetEvent]] = {}
+
+        for session_name, session in self.program.items():
+            self.events_by_session[session_name] = tuple(session["events"])
+            self.__entry_events_by_session[session_name] = tuple(
+                event for event in session["events"] if event.round != "FIN")
+
+            for event in session["events"]:
+                self.events_by_number[event.number] = event
+                by_round.setdefault(event.round, []).append(event)
+                by_gender_age.setdefault((event.gender, event.min_age, event.max_age),
+                                         []).append(event)
+
+        self.events = tuple(event for events in self.events_by_session.values()
+                            for event in events)
+        self.events_by_round = {key: tuple(events) for key, events in by_round.items()}
+        self.events_by_gender_age = {key: tuple(events) for key, events in by_gender_age.items()}
+
+    def get_all_events(self) -> tuple[SwimMeetEvent, ...]:
+        '''Get all the events in this swim meet'''
+        return self.events
+
+    def get_events_in_session(self, session_name: str,
+                              include_finals: bool = True) -> tuple[SwimMeetEvent, ...]:
         '''Get all the events in a session'''
-        return self.program[session_name]["events"]
+        if include_finals:
+            return self.events_by_session[session_name]
+
+        return self.__entry_events_by_session[session_name]
 
     def __str__(self):
         return_str = f"MEET:\n{self.meet_name} in {self.city} ({self.course})\n"
@@ -278,10 +421,22 @@ class SwimMeet:
 class RankingsEntry:
     '''Container for information about rankings (name, place, time,...)'''
     placing: int
-    swim_time: str
+    swim_time: SwimTime
     swimmer_name: str
     nationality: str
     club: str
+    # DSQ, DNS, ... empty for a valid result
+    status: str = ""
+
+@dataclass
+class RelayLegEntry:
+    '''Leg of a swimmer in a relay, the times are None if unknown'''
+    event_name: str
+    team: str
+    leg: int
+    leg_time: SwimTime
+    # Hundredths
+    reaction_time: int
 
 class MeetResults:
     '''Class to extract results from the results lenex and construct rankings
@@ -291,7 +446,10 @@ class MeetResults:
     class ResultIdEntry:
         '''Hashmap value for result_id -> athlete_id and swimtime'''
         athlete_id: str
-        swim_time: str
+        swim_time: SwimTime
+        event_id: str = ""
+        # DSQ, DNS, ... empty for a valid result
+        status: str = ""
 
         def __str__(self) -> str:
             return f"{self.athlete_id}: {self.swim_time}"
@@ -300,8 +458,14 @@ class MeetResults:
     class RelayIdEntry:
         '''Hashmap value for result_id of relays'''
         swimmer_ids: list[str]
-        swim_time: str
+        swim_time: SwimTime
         club: str
+        event_id: str = ""
+        status: str = ""
+        # Per leg (same order as swimmer_ids), None if unknown
+        reaction_times: list[int] = None
+        # Swimmer names of the team, set once all the athletes are known
+        label: str = ""
 
         def __str__(self) -> str:
             return f"{self.swimmer_ids} - {self.club}"
@@ -312,10 +476,22 @@ class MeetResults:
         swimmer_name: str
         nationality: str
         club: str
+        birth_date: str = ""
+        gender: str = ""
 
         def __str__(self) -> str:
             return f"{self.swimmer_name} - {self.club}"
 
+    @dataclass
+    class EventIdEntry:
+        '''Hashmap value for event_id -> swim style, round and date of the event'''
+        stroke: str
+        distance: int
+        relay_count: int
+        event_round: str
+        gender: str
+        date: str
+
     @dataclass
     class EventResult:
         '''Container with the results of a certain event'''
@@ -325,33 +501,51 @@ class MeetResults:
         age_group: str
         rankings: list[str]
         relay: bool
+        # Placings of the rankings when computed from the times (equal times share
+        # a placing), otherwise the position in the rankings is the placing
+        placings: list[int] = None
+        event_id: str = ""
 
         def __str__(self) -> str:
             return f"{self.event_round} {self.gender} {self.event_name} " + \
                    f"{self.age_group}: {str(self.rankings)}"
 
-    def __init__(self, log: logging.Logger, results_root: ET.Element) -> None:
+    def __init__(self, log: logging.Logger, results_root: ET.Element,
+                 meet_index: int = 0) -> None:
         self.log = log
 
         # Meet and lenex information
         self.meet_name = None
+        self.course = None
+        self.city = None
+        self.age_date = None
+        self.age_date_type = "YEAR"
         self.meet_root = None
-        self.__extract_meet_root(results_root)
+        self.__extract_meet_root(results_root, meet_index)
+        self.__extracted = False
 
         # Bookkeeping the id's and results
         self.result_ids: dict[str, self.ResultIdEntry] = {}
         self.relay_ids: dict[str, self.RelayIdEntry] = {}
         self.athlete_ids: dict[str, self.AthleteIdEntry] = {}
+        self.event_ids: dict[str, self.EventIdEntry] = {}
+        self.splits = SplitTimes()
+        # athlete_id -> (relay result id, leg number) of every relay swum
+        self.relay_legs: dict[str, list[tuple[str, int]]] = {}
         self.meet_results: list[self.EventResult] = []
         self.results: dict[str, list[RankingsEntry]] = {}
         self.results_relays: dict[str, list[RankingsEntry]] = {}
         self.results_filters: list[str] = []
+        # Ranking name (key of results/results_relays) -> event result it was made from
+        self.result_events: dict[str, self.EventResult] = {}
+        # event id -> result ids (individual and relay), built when needed for ranking
+        self.__results_by_event: dict[str, list[str]] = None
 
-    def __extract_meet_root(self, results_root: ET.Element) -> ET.Element:
+    def __extract_meet_root(self, results_root: ET.Element, meet_index: int) -> ET.Element:
         if self.meet_root is None:
             for node in results_root:
-                if node.tag == "MEETS":
-                    self.meet_root = node[0]
+                if node.tag == "MEETS" and len(node) > meet_index:
+                    self.meet_root = node[meet_index]
 
         if self.meet_root is None:
             raise ValueError("Results could not be extracted from given lenex")
@@ -362,6 +556,13 @@ class MeetResults:
         '''Extract some generic information from the lenex 
            For now this will be limited to meet_name'''
         self.meet_name = self.meet_root.attrib.get('name', '?').replace('/', '-')
+        self.course = self.meet_root.attrib.get('course', 'LCM')
+        self.city = self.meet_root.attrib.get('city', '')
+
+        age_date_node = self.meet_root.find("AGEDATE")
+        if age_date_node is not None:
+            self.age_date = parse_age_date(age_date_node.attrib.get("value"))
+            self.age_date_type = age_date_node.attrib.get("type", "YEAR")
 
     def __extract_personal_results(self, athlete_node: ET.Element, club: str):
         # Get general athelete information
@@ -369,7 +570,9 @@ class MeetResults:
         first_name = athlete_node.attrib.get("firstname", "?")
         athlete_entry = self.AthleteIdEntry(f"{first_name} {last_name}",
                                             athlete_node.attrib.get("nation", "BEL"),
-                                            club)
+                                            club,
+                                            athlete_node.attrib.get("birthdate", ""),
+                                            athlete_node.attrib.get("gender", ""))
 
         athlete_id = athlete_node.attrib.get("athleteid", "?")
         self.athlete_ids[athlete_id] = athlete_entry
@@ -387,35 +590,70 @@ class MeetResults:
             return
 
         for result_node in results_node:
-            # Remove unneccesary hour prefix
-            swim_time = result_node.attrib.get("swimtime", "?")
-            if swim_time.startswith("00:"):
-                swim_time = swim_time[3:]
+            # No time for DSQ/DNS/...
+            swim_time = SwimTime.from_lenex(result_node.attrib.get("swimtime"))
+            result_id = result_node.attrib.get("resultid", "?")
+
+            result_entry = self.ResultIdEntry(athlete_id, swim_time,
+                                              result_node.attrib.get("eventid", ""),
+                                              result_node.attrib.get("status", ""))
+            self.result_ids[result_id] = result_entry
 
-            result_entry = self.ResultIdEntry(athlete_id, swim_time)
-            self.result_ids[result_node.attrib.get("resultid", "?")] = result_entry
+            for node in result_node:
+                if node.tag == "SPLITS":
+                    self.splits.add_from_xml(result_id, node)
 
     def __extract_relay_result(self, result_node: ET.Element, club_name: str):
         result_id = result_node.attrib.get("resultid", "?")
-        swim_time = result_node.attrib.get("swimtime", "?")
-        if swim_time.startswith("00:"):
-            swim_time = swim_time[3:]
+        swim_time = SwimTime.from_lenex(result_node.attrib.get("swimtime"))
 
         relaypositions_nodes = None
         for node in result_node:
             if node.tag == "RELAYPOSITIONS":
                 relaypositions_nodes = node
-                break
+            elif node.tag == "SPLITS":
+                self.splits.add_from_xml(result_id, node)
 
         if relaypositions_nodes is None:
             self.log.debug("No athletes in relay")
             return
 
-        relay_athlete_ids: list[str] = []
+        # The legs are ordered on their number, not on their order in the lenex
+        relay_legs: list[tuple[int, str, int]] = []
         for relay_position in relaypositions_nodes:
-            relay_athlete_ids.append(relay_position.attrib.get("athleteid", "?"))
-
-        self.relay_ids[result_id] = self.RelayIdEntry(relay_athlete_ids, swim_time, club_name)
+            number = relay_position.attrib.get("number", "")
+            relay_legs.append((int(number) if number.isdigit() else len(relay_legs) + 1,
+                               relay_position.attrib.get("athleteid", "?"),
+                               self.__parse_reaction_time(
+                                   relay_position.attrib.get("reactiontime"))))
+        relay_legs.sort()
+
+        self.relay_ids[result_id] = self.RelayIdEntry([leg[1] for leg in relay_legs],
+                                                      swim_time, club_name,
+                                                      result_node.attrib.get("eventid", ""),
+                                                      result_node.attrib.get("status", ""),
+                                                      [leg[2] for leg in relay_legs])
+
+    @staticmethod
+    def __parse_reaction_time(reaction_time: str) -> int:
+        '''Lenex reaction times are signed hundredths (e.g. +65), None if unknown'''
+        try:
+            return int(reaction_time)
+        except (TypeError, ValueError):
+            return None
+
+    def __build_relay_index(self):
+        '''Set the team label of every relay and index the relay legs per swimmer,
+           relay swimmers that are not in the lenex are shown as ?'''
+        self.relay_legs = {}
+        for result_id, relay_entry in self.relay_ids.items():
+            swimmer_names = []
+            for leg, swimmer_id in enumerate(relay_entry.swimmer_ids, 1):
+                athlete_entry = self.athlete_ids.get(swimmer_id)
+                swimmer_names.append("?" if athlete_entry is None else athlete_entry.swimmer_name)
+                self.relay_legs.setdefault(swimmer_id, []).append((result_id, leg))
+
+            relay_entry.label = " - ".join(swimmer_names)
 
     def __extract_relays_results(self, relays_node: ET.Element, club_name: str):
         for relay_node in relays_node:
@@ -481,8 +719,45 @@ class MeetResults:
 
         return f"{agemin}-{agemax}"
 
-    def __parse_agegroups(self, agegroups_node: ET.Element, gender: str,
-                          event_round: str, event_name: str, relay: bool) -> None:
+    def __get_results_by_event(self) -> dict[str, list[str]]:
+        '''Group all the result ids on event in a single pass'''
+        if self.__results_by_event is None:
+            self.__results_by_event = {}
+            for result_ids in (self.result_ids, self.relay_ids):
+                for result_id, result_entry in result_ids.items():
+                    self.__results_by_event.setdefault(result_entry.event_id,
+                                                       []).append(result_id)
+
+        return self.__results_by_event
+
+    def __get_athlete_age(self, athlete_id: str) -> int:
+        athlete_entry = self.athlete_ids.get(athlete_id)
+        if athlete_entry is None:
+            return None
+
+        return get_age(athlete_entry.birth_date, self.age_date, self.age_date_type)
+
+    def __rank_event(self, event_id: str, relay: bool, min_age: int = -1,
+                     max_age: int = -1) -> tuple[list[str], list[int]]:
+        '''Rank the results of an event in an age group from their times. Relays
+           have no age, they are all ranked together'''
+        results = []
+        for result_id in self.__get_results_by_event().get(event_id, []):
+            result_entry = self.relay_ids.get(result_id) if relay else \
+                           self.result_ids.get(result_id)
+            if result_entry is None:
+                continue
+
+            if not relay and not in_age_group(self.__get_athlete_age(result_entry.athlete_id),
+                                              min_age, max_age):
+                continue
+
+            results.append((result_id, result_entry.swim_time, result_entry.status))
+
+        return rank_results(results)
+
+    def __parse_agegroups(self, agegroups_node: ET.Element, gender: str, event_round: str,
+                          event_name: str, relay: bool, event_id: str) -> None:
         for agegroup_node in agegroups_node:
             age = self.__parse_age(agegroup_node.attrib.get("agemin", "-1"),
                                    agegroup_node.attrib.get("agemax", "-1"))
@@ -494,26 +769,41 @@ class MeetResults:
                     break
 
             if rankings_node is None:
-                self.log.debug(f"No rankings found for {event_name}")
-                return
+                if relay and len(agegroups_node) > 1:
+                    self.log.debug(f"Cannot rank relay {event_name} over multiple agegroups")
+                    continue
+
+                # Construct the rankings from the results
+                order, placings = self.__rank_event(
+                    event_id, relay, int(agegroup_node.attrib.get("agemin", "-1")),
+                    int(agegroup_node.attrib.get("agemax", "-1")))
+                self.meet_results.append(self.EventResult(event_round, gender, event_name,
+                                                          age, order, relay, placings,
+                                                          event_id))
+                continue
 
             order = []
             for ranking in rankings_node:
                 order.append(ranking.attrib.get("resultid", "?"))
 
             self.meet_results.append(self.EventResult(event_round, gender, event_name,
-                                                      age, order, relay))
+                                                      age, order, relay, event_id=event_id))
 
-    def __extract_results_from_event(self, event_node: ET.Element):
+    def __extract_results_from_event(self, event_node: ET.Element, session_date: str):
         event_gender = event_node.attrib.get("gender", "?")
         event_round = event_node.attrib.get("round", "PRE")
 
+        event_id = event_node.attrib.get("eventid", "?")
         agegroups_node = None
         event_name = ""
         relay = False
         for node in event_node:
             if node.tag == "SWIMSTYLE":
                 relaycount = node.attrib.get("relaycount", "1")
+                self.event_ids[event_id] = \
+                    self.EventIdEntry(node.attrib.get("stroke", "?"),
+                                      int(node.attrib.get("distance", "0")),
+                                      int(relaycount), event_round, event_gender, session_date)
                 relay = False
                 relay_prepend = ""
                 if relaycount != "1":
@@ -526,10 +816,16 @@ class MeetResults:
                 agegroups_node = node
 
         if agegroups_node is None:
+            # Rank all the results of the event together
             self.log.debug(f"No agegroups for event {event_name}")
+            order, placings = self.__rank_event(event_id, relay)
+            self.meet_results.append(self.EventResult(event_round, event_gender, event_name,
+                                                      "open", order, relay, placings,
+                                                      event_id))
             return
 
-        self.__parse_agegroups(agegroups_node, event_gender, event_round, event_name, relay)
+        self.__parse_agegroups(agegroups_node, event_gender, event_round, event_name, relay,
+                               event_id)
 
     def __extract_results_from_session(self, session_node: ET.Element):
         for node in session_node:
@@ -540,8 +836,9 @@ class MeetResults:
         if events_node is None:
             raise ValueError("No events found in session")
 
+        session_date = session_node.attrib.get("date", "")
         for event in events_node:
-            self.__extract_results_from_event(event)
+            self.__extract_results_from_event(event, session_date)
 
     def __extract_meet_results(self):
         for node in self.meet_root:
@@ -565,7 +862,8 @@ class MeetResults:
             raise ValueError(f"Unknown athlete id {result_id_entry.athlete_id}")
 
         return RankingsEntry(placing, result_id_entry.swim_time, athlete_id_entry.swimmer_name,
-                             athlete_id_entry.nationality, athlete_id_entry.club)
+                             athlete_id_entry.nationality, athlete_id_entry.club,
+                             result_id_entry.status)
 
     def __get_ranking_entry_for_result_id_relay(self, result_id: str,
                                                 placing: int) -> RankingsEntry:
@@ -573,15 +871,8 @@ class MeetResults:
         if relay_id_entry is None:
             raise ValueError(f"Unknown relay id {result_id}")
 
-        swimmer_names = ""
-        for swimmer_id in relay_id_entry.swimmer_ids:
-            athlete_entry = self.athlete_ids.get(swimmer_id)
-            swimmer_names = f"{swimmer_names} {athlete_entry.swimmer_name} - "
-
-        swimmer_names = swimmer_names[:-3]
-
-        return RankingsEntry(placing, relay_id_entry.swim_time, swimmer_names,
-                             "", relay_id_entry.club)
+        return RankingsEntry(placing, relay_id_entry.swim_time, relay_id_entry.label,
+                             "", relay_id_entry.club, relay_id_entry.status)
 
     def __parse_filters(self, filters: list[str]) -> tuple[list, str, str]:
         return_filters = []
@@ -598,13 +889,67 @@ class MeetResults:
 
         return return_filters, return_nat, return_club
 
+    def extract_results(self):
+        '''Extract all the athletes, results and events from the lenex. Only
+           done once, even if called multiple times'''
+        if self.__extracted:
+            return
+
+        self.__extract_general_information()
+        self.__parse_individual_results()
+        self.__build_relay_index()
+        self.__extract_meet_results()
+        self.__extracted = True
+
+    def rank_in_birth_year_groups(self, birth_year_groups: list[tuple[int, int]]):
+        '''Replace the individual rankings by rankings computed from the times in
+           virtual age groups of (first, last) birth year. Relays keep their rankings.
+           Has to be called before construct_rankings'''
+        self.extract_results()
+
+        # Single grouped pass over all the results: (event id, group index) -> results
+        grouped_results: dict[tuple[str, int], list[tuple[str, SwimTime, str]]] = {}
+        for result_id, result_entry in self.result_ids.items():
+            athlete_entry = self.athlete_ids.get(result_entry.athlete_id)
+            if athlete_entry is None or not athlete_entry.birth_date[:4].isdigit():
+                continue
+
+            birth_year = int(athlete_entry.birth_date[:4])
+            for group_index, (first_year, last_year) in enumerate(birth_year_groups):
+                if first_year <= birth_year <= last_year:
+                    grouped_results.setdefault((result_entry.event_id, group_index), []).append(
+                        (result_id, result_entry.swim_time, result_entry.status))
+
+        # Keep the order of the events, every event once
+        virtual_results = []
+        ranked_events = set()
+        for res in self.meet_results:
+            if res.relay:
+                virtual_results.append(res)
+                continue
+            if res.event_id in ranked_events:
+                continue
+            ranked_events.add(res.event_id)
+
+            for group_index, (first_year, last_year) in enumerate(birth_year_groups):
+                results = grouped_results.get((res.event_id, group_index))
+                if not results:
+                    continue
+
+                order, placings = rank_results(results)
+                age_group = str(first_year) if first_year == last_year \
+                            else f"{first_year}-{last_year}"
+                virtual_results.append(self.EventResult(res.event_round, res.gender,
+                                                        res.event_name, age_group, order,
+                                                        False, placings, res.event_id))
+
+        self.meet_results = virtual_results
+
     def construct_rankings(self, filters: list[str]):
         '''Create rankings from the lenex results and use filters to
            get only club/nationalities that we are interested in'''
         # Preparation to be able to construct the rankings
-        self.__extract_general_information()
-        self.__parse_individual_results()
-        self.__extract_meet_results()
+        self.extract_results()
 
         self.results_filters = filters
         rest_filters, nationality, club = self.__parse_filters(filters)
@@ -614,13 +959,24 @@ class MeetResults:
 
             if "ONLY_FINALS" in rest_filters and res.event_round == "PRE":
                 continue
+            self.result_events[event_name] = res
 
             # DNS, DQ, DNF -> placed at the end so doesn't matter that they are included
-            placing = 1
-            for result_id in res.rankings:
+            # Computed placings (with ties) are used unless the nationality filter renumbers
+            use_placings = res.placings is not None and nationality == ""
+            position = 1
+            for index, result_id in enumerate(res.rankings):
+                placing = res.placings[index] if use_placings else position
                 if "ONLY_PODIUM" in filters and placing >= 4:
                     break
 
+                # Results that were not extracted (e.g. relays without positions)
+                # can not be of the filtered club
+                if club != "" and result_id not in self.relay_ids and \
+                   result_id not in self.result_ids:
+                    position += 1
+                    continue
+
                 if not res.relay:
                     ranking_entry = self.__get_ranking_entry_for_result_id(result_id, placing)
 
@@ -640,7 +996,88 @@ class MeetResults:
                             self.results_relays[event_name] = []
                         self.results_relays[event_name].append(ranking_entry)
 
-                placing += 1
+                position += 1
+
+    def get_swimmer_pacing(self, club: str = "") -> dict[str, list[PacingEntry]]:
+        '''Pacing of every individual result with splits per swimmer, optionally
+           only of the swimmers of a club'''
+        self.extract_results()
+
+        swimmer_pacing: dict[str, list[PacingEntry]] = {}
+        for result_id, result_entry in self.result_ids.items():
+            if result_entry.swim_time is None or result_entry.status or \
+               not self.splits.has_splits(result_id):
+                continue
+
+            athlete_entry = self.athlete_ids.get(result_entry.athlete_id)
+            event_entry = self.event_ids.get(result_entry.event_id)
+            if athlete_entry is None or event_entry is None or \
+               (club != "" and athlete_entry.club != club):
+                continue
+
+            pacing = self.splits.get_pacing(result_id, f"{event_entry.event_round} " + \
+                                            f"{event_entry.distance}{event_entry.stroke}",
+                                            result_entry.swim_time)
+            if pacing is not None:
+                swimmer_pacing.setdefault(athlete_entry.swimmer_name, []).append(pacing)
+
+        return swimmer_pacing
+
+    def get_relay_participation(self, athlete_id: str) -> list[tuple[str, int]]:
+        '''The (relay result id, leg) of every relay a swimmer swam in'''
+        self.extract_results()
+        return self.relay_legs.get(athlete_id, [])
+
+    def get_relay_leg_times(self, result_id: str) -> list[int]:
+        '''Time of every leg of a relay from its splits, empty if the splits at the
+           end of the legs are not known'''
+        self.extract_results()
+
+        relay_entry = self.relay_ids.get(result_id)
+        if relay_entry is None:
+            raise ValueError(f"Unknown relay id {result_id}")
+
+        event_entry = self.event_ids.get(relay_entry.event_id)
+        if event_entry is None or relay_entry.swim_time is None:
+            return []
+
+        split_times = dict(self.splits.get_splits(result_id))
+        cumulative = [split_times.get(leg * event_entry.distance)
+                      for leg in range(1, event_entry.relay_count)] + [relay_entry.swim_time]
+        if None in cumulative:
+            return []
+
+        return [end - start for start, end in zip([0] + cumulative[:-1], cumulative)]
+
+    def get_swimmer_relay_legs(self, club: str = "") -> dict[str, list[RelayLegEntry]]:
+        '''The relay legs of every swimmer, optionally only of the swimmers of a club'''
+        self.extract_results()
+
+        swimmer_relay_legs: dict[str, list[RelayLegEntry]] = {}
+        for athlete_id, athlete_entry in self.athlete_ids.items():
+            if club != "" and athlete_entry.club != club:
+                continue
+
+            for result_id, leg in self.get_relay_participation(athlete_id):
+                relay_entry = self.relay_ids[result_id]
+                event_entry = self.event_ids.get(relay_entry.event_id)
+                if event_entry is None or relay_entry.status:
+                    continue
+
+                leg_times = self.get_relay_leg_times(result_id)
+                swimmer_relay_legs.setdefault(athlete_entry.swimmer_name, []).append(
+                    RelayLegEntry(f"{event_entry.event_round} {event_entry.relay_count}x" + \
+                                  f"{event_entry.distance}{event_entry.stroke}",
+                                  relay_entry.label, leg,
+                                  SwimTime(leg_times[leg-1]) if leg_times else None,
+                                  relay_entry.reaction_times[leg-1]))
+
+        return swimmer_relay_legs
+
+    def release_xml(self):
+        '''Drop the reference to the xml once the rankings are constructed, e.g.
+           before sending the results to another process'''
+        self.meet_root = None
 
     def print_rankings(self):
         '''Print the constructed rankings to the console'''
@@ -651,7 +1088,8 @@ class MeetResults:
 
             self.log.info(f"Rankings for {event}:")
             for e in ranking:
-                self.log.info(f"{e.placing}: {e.swimmer_name} - {e.club} - {e.swim_time}")
+                swim_time = "?" if e.swim_time is None else e.swim_time
+                self.log.info(f"{e.placing}: {e.swimmer_name} - {e.club} - {swim_time}")
             self.log.info(" ")
 
         for event, ranking in self.results_relays.items():
@@ -660,7 +1098,8 @@ class MeetResults:
 
             self.log.info(f"Results for {event}")
             for e in ranking:
-                self.log.info(f"{e.placing}: {e.swimmer_name} - {e.club} - {e.swim_time}")
+                swim_time = "?" if e.swim_time is None else e.swim_time
+                self.log.info(f"{e.placing}: {e.swimmer_name} - {e.club} - {swim_time}")
             self.log.info(" ")
 
     def __str__(self) -> str:
@@ -0,0 +1,182 @@
+'''
+Contains a local http server keeping the parsed meets in memory, such that
+scripts and spreadsheets can query the eligibility and rankings of a meet
+repeatedly without parsing the lenex every time. Only meant for localhost.
+'''
+
+import os
+import json
+import uuid
+import logging
+import threading
+
+from collections import OrderedDict
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+
+from lib.club_management import Club
+from lib.meet_management import SwimMeet, MeetResults, RankingsEntry
+from lib.lenex_index import load_swim_meets, load_meet_results
+from lib.possible_events import PossibleEvents
+from lib.results_excel import ResultsExcel
+
+class MeetCache:
+    '''LRU of parsed lef files. An entry is reloaded when its lef changed on disk.
+       The size of the lefs is used as an estimate of the memory in use'''
+    def __init__(self, log: logging.Logger, max_entries: int = 8,
+                 max_lef_bytes: int = 512 * 1024 * 1024, backend: str = "etree"):
+        self.log = log
+        self.max_entries = max_entries
+        self.max_lef_bytes = max_lef_bytes
+        self.backend = backend
+
+        # key -> (lef modification time, lef size, parsed value)
+        self.__entries: OrderedDict[tuple, tuple[float, int, object]] = OrderedDict()
+        self.__lock = threading.Lock()
+
+    def __get(self, key: tuple, lef_path: str, loader):
+        if not os.path.exists(lef_path):
+            raise FileNotFoundError(f"No lef found at {lef_path}")
+        stat = os.stat(lef_path)
+
+        with self.__lock:
+            entry = self.__entries.get(key)
+            if entry is not None and entry[0] == stat.st_mtime:
+                self.__entries.move_to_end(key)
+                return entry[2]
+
+        # Parsed without holding the lock, other meets can be served meanwhile
+        value = loader()
+
+        with self.__lock:
+            self.__entries[key] = (stat.st_mtime, stat.st_size, value)
+            self.__entries.move_to_end(key)
+            self.__evict()
+
+        return value
+
+    def __evict(self):
+        # The newest entry is always kept, even if it is over the limits on its own
+        while len(self.__entries) > 1 and \
+              (len(self.__entries) > self.max_entries or
+               sum(entry[1] for entry in self.__entries.values()) > self.max_lef_bytes):
+            key, _ = self.__entries.popitem(last=False)
+            self.log.debug(f"Evicted {key} from the meet cache")
+
+    def get_swim_meet(self, lef_path: str) -> SwimMeet:
+        '''The (first) meet of a competition lef'''
+        return self.__get(("meet", lef_path), lef_path,
+                          lambda: load_swim_meets(self.log, lef_path,
+                                                  backend=self.backend)[0])
+
+    def get_meet_results(self, lef_path: str, filters: list[str]) -> list[MeetResults]:
+        '''The rankings of every meet of a results lef, with filters applied'''
+        return self.__get(("results", lef_path, tuple(filters)), lef_path,
+                          lambda: load_meet_results(self.log, lef_path, filters,
+                                                    backend=self.backend))
+
+    def __len__(self) -> int:
+        with self.__lock:
+            return len(self.__entries)
+
+class MeetServer(ThreadingHTTPServer):
+    '''Serves on localhost:
+       GET /eligibility?lef=<competition lef>&group=<group>
+       GET /rankings?lef=<results lef>&filter=<filter>&filter=...
+       GET /xlsx?lef=<results lef>&filter=<filter>&filter=...'''
+    def __init__(self, log: logging.Logger, club: Club, cache: MeetCache,
+                 port: int = 8080):
+        super().__init__(("127.0.0.1", port), _MeetRequestHandler)
+        self.log = log
+        self.club = club
+        self.cache = cache
+
+def _ranking_to_json(ranking: list[RankingsEntry]) -> list[dict]:
+    return [{"placing": entry.placing,
+             "swim_time": None if entry.swim_time is None else str(entry.swim_time),
+             "swimmer_name": entry.swimmer_name,
+             "nationality": entry.nationality,
+             "club": entry.club} for entry in ranking]
+
+class _MeetRequestHandler(BaseHTTPRequestHandler):
+    '''Handles the requests of the meet server, one thread per request'''
+    server: MeetServer
+
+    def __send(self, status: int, content_type: str, body: bytes):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def __send_json(self, value, status: int = 200):
+        self.__send(status, "application/json", json.dumps(value).encode("utf-8"))
+
+    def __get_eligibility(self, query: dict) -> dict:
+        meet = self.server.cache.get_swim_meet(query["lef"][0])
+        group = query.get("group", [""])[0]
+        if group not in self.server.club.get_groups():
+            raise ValueError(f"Unknown group {group}")
+
+        possible_events = PossibleEvents(meet, self.server.club)
+        possible_events.generate_possible_events_dict([group])
+
+        return {swimmer.name: [str(event) for event in
+                               possible_events.get_valid_events_for_swimmer(swimmer.name)]
+                for swimmer in self.server.club.get_swimmers_from_group(group)}
+
+    def __get_rankings(self, query: dict) -> dict:
+        meets = self.server.cache.get_meet_results(query["lef"][0], query.get("filter", []))
+
+        return {meet_results.meet_name: {
+                    "individual": {event_name: _ranking_to_json(ranking)
+                                   for event_name, ranking in meet_results.results.items()},
+                    "relays": {event_name: _ranking_to_json(ranking)
+                               for event_name, ranking in meet_results.results_relays.items()}}
+                for meet_results in meets}
+
+    def __get_xlsx(self, query: dict) -> bytes:
+        meets = self.server.cache.get_meet_results(query["lef"][0], query.get("filter", []))
+
+        # Every request gets its own excel, requests are handled in parallel
+        excel = ResultsExcel(self.server.log, f"server_{uuid.uuid4().hex}")
+        for meet_results in meets:
+            excel.add_results_to_excel(meet_results.results, meet_results.results_relays,
+                                       meet_results.meet_name)
+        excel.close()
+
+        with open(excel.file_path, "rb") as fi:
+            body = fi.read()
+        os.remove(excel.file_path)
+
+        return body
+
+    def do_GET(self):
+        '''Route the request on its path'''
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+
+        try:
+            if "lef" not in query:
+                raise ValueError("No lef given")
+
+            if url.path == "/eligibility":
+                self.__send_json(self.__get_eligibility(query))
+            elif url.path == "/rankings":
+                self.__send_json(self.__get_rankings(query))
+            elif url.path == "/xlsx":
+                self.__send(200, "application/vnd.openxmlformats-officedocument." + \
+                                 "spreadsheetml.sheet", self.__get_xlsx(query))
+            else:
+                self.__send_json({"error": f"Unknown path {url.path}"}, 404)
+        except FileNotFoundError as e:
+            self.__send_json({"error": str(e)}, 404)
+        except ValueError as e:
+            self.__send_json({"error": str(e)}, 400)
+        except Exception as e: # pylint: disable=broad-exception-caught
+            # E.g. a corrupt lef, the client still gets an answer
+            self.server.log.exception(f"Request {self.path} failed")
+            self.__send_json({"error": f"Internal error: {e}"}, 500)
+
+    def log_message(self, format, *args): # pylint: disable=redefined-builtin
+        self.server.log.debug(f"{self.address_string()} {format % args}")
@@ -0,0 +1,132 @@
+'''
+Contains the World Aquatics points calculation. Points are computed from a table
+of base times, P = 1000 * (B / T)^3, for every individual result of the added meets.
+'''
+
+import os
+import csv
+import logging
+
+from dataclasses import dataclass
+
+from lib.meet_management import MeetResults
+from lib.swim_time import SwimTime
+
+class BaseTimes:
+    '''Base times per (course, gender, stroke, distance), read from a csv with the
+       columns course, gender, stroke, distance and basetime (lenex swim time).
+       The base times are published every season by World Aquatics and are not
+       shipped, copy them into data/base_times.csv with a line per event, e.g.
+           course,gender,stroke,distance,basetime
+           LCM,M,FREE,50,00:00:20.91
+       with the course, gender and stroke as in the lenex'''
+    DEFAULT_PATH = "data/base_times.csv"
+    COLUMNS = ("course", "gender", "stroke", "distance", "basetime")
+
+    def __init__(self, log: logging.Logger, csv_path: str = DEFAULT_PATH):
+        self.log = log
+        self.base_times: dict[tuple[str, str, str, int], SwimTime] = {}
+
+        if not os.path.exists(csv_path):
+            raise ValueError(f"No base times found at {csv_path}, add the World Aquatics " + \
+                             "base times of the season (see BaseTimes in lib/points.py)")
+
+        with open(csv_path, newline='', encoding="utf-8-sig") as fi:
+            reader = csv.DictReader(fi)
+            missing_columns = set(self.COLUMNS) - set(reader.fieldnames or [])
+            if missing_columns:
+                raise ValueError(f"Missing columns {sorted(missing_columns)} in {csv_path}")
+
+            for row in reader:
+                base_time = SwimTime.from_lenex(row["basetime"])
+                if base_time is None or not row["distance"].isdigit():
+                    raise ValueError(f"Invalid base time on line {reader.line_num} " + \
+                                     f"of {csv_path}")
+
+                self.base_times[(row["course"], row["gender"], row["stroke"],
+                                 int(row["distance"]))] = base_time
+
+        if not self.base_times:
+            raise ValueError(f"No base times in {csv_path}")
+
+        self.log.debug(f"Read {len(self.base_times)} base times from {csv_path}")
+
+    def get(self, course: str, gender: str, stroke: str, distance: int) -> SwimTime:
+        '''Get the base time of an event, None if unknown'''
+        return self.base_times.get((course, gender, stroke, distance))
+
+@dataclass
+class PointsEntry:
+    '''Points of a single individual result'''
+    points: int
+    swim_time: SwimTime
+    swimmer_name: str
+    club: str
+    event_name: str
+    meet_name: str
+
+class PointsCalculator:
+    '''Points of all the individual results of one or more meets'''
+    def __init__(self, log: logging.Logger, base_times: BaseTimes):
+        self.log = log
+        self.base_times = base_times
+        self.entries: list[PointsEntry] = []
+
+    def add_meet(self, meet_results: MeetResults):
+        '''Compute the points of all the valid individual results of a meet. The
+           results are grouped on base time, such that every group is computed in
+           one pass over its times'''
+        meet_results.extract_results()
+
+        # (gender, stroke, distance) -> [(swim time, athlete id, event id)]
+        grouped_results: dict[tuple[str, str, int], list[tuple[SwimTime, str, str]]] = {}
+        for result_entry in meet_results.result_ids.values():
+            event_entry = meet_results.event_ids.get(result_entry.event_id)
+            athlete_entry = meet_results.athlete_ids.get(result_entry.athlete_id)
+            if event_entry is None or athlete_entry is None or event_entry.relay_count > 1 \
+               or result_entry.swim_time is None or result_entry.swim_time <= 0 \
+               or result_entry.status:
+                continue
+
+            # Mixed events use the gender of the swimmer
+            gender = athlete_entry.gender or event_entry.gender
+            grouped_results.setdefault((gender, event_entry.stroke, event_entry.distance),
+                                       []).append((result_entry.swim_time,
+                                                   result_entry.athlete_id,
+                                                   result_entry.event_id))
+
+        number_of_entries = len(self.entries)
+        for (gender, stroke, distance), results in grouped_results.items():
+            base_time = self.base_times.get(meet_results.course, gender, stroke, distance)
+            if base_time is None:
+                self.log.debug(f"No base time for {meet_results.course} {gender} " + \
+                               f"{distance} {stroke}")
+                continue
+
+            # P = 1000 * (B / T)^3 = factor / T^3, points are rounded down
+            factor = 1000 * base_time ** 3
+            event_name = f"{distance}{stroke}"
+            self.entries += [PointsEntry(factor // swim_time ** 3, swim_time,
+                                         meet_results.athlete_ids[athlete_id].swimmer_name,
+                                         meet_results.athlete_ids[athlete_id].club,
+                                         f"{meet_results.event_ids[event_id].event_round} " + \
+                                         f"{event_name}", meet_results.meet_name)
+                             for swim_time, athlete_id, event_id in results]
+
+        self.log.info(f"Computed the points of {len(self.entries) - number_of_entries} " + \
+                      f"results of {meet_results.meet_name}")
+
+    def get_points_ranking(self) -> list[PointsEntry]:
+        '''All the results, highest points first'''
+        return sorted(self.entries, key=lambda entry: (-entry.points, entry.swimmer_name))
+
+    def get_best_points_per_swimmer(self) -> list[PointsEntry]:
+        '''The result with the highest points of every swimmer, highest points first'''
+        best_entries: dict[tuple[str, str], PointsEntry] = {}
+        for entry in self.entries:
+            key = (entry.swimmer_name, entry.club)
+            if key not in best_entries or entry.points > best_entries[key].points:
+                best_entries[key] = entry
+
+        return sorted(best_entries.values(), key=lambda entry: (-entry.points,
+                                                                entry.swimmer_name))
@@ -4,42 +4,103 @@ from lib.meet_management import SwimMeet, SwimMeetEvent
 from lib.club_management import Club, Swimmer
 
 class PossibleEvents:
-    '''Contains the logic to check which event is (in)valid for a certain swimmer'''
+    '''Contains the logic to check which event is (in)valid for a certain swimmer.
+       Gender and age checks only depend on the (gender, age) class of a swimmer,
+       they are done once per class. The class events can be shared by multiple
+       clubs registering for the same meet'''
+    # Swimmers without a time can not enter events with a qualifying time
+    ALLOW_NT_WITH_LIMIT = False
 
-    def __init__(self, meet: SwimMeet, club: Club):
+    def __init__(self, meet: SwimMeet, club: Club, best_times: dict = None,
+                 class_events: dict = None):
         self.meet = meet
         self.club = club
+        # (swimmer name, birth year) -> (stroke, distance, course) -> best time in
+        # hundredths (see ResultsDatabase.get_personal_bests)
+        # Without best times, limit times are not checked
+        self.best_times: dict[tuple[str, str], dict[tuple[str, int, str], int]] = best_times
+        # (gender, age) -> (valid events, invalid events), the lists are shared
+        # by all the swimmers of the class and should not be modified
+        self.class_events: dict[tuple[str, int], tuple[list, list]] = \
+            {} if class_events is None else class_events
         self.swimmer_possible_event_dict: dict = {}
         self.swimmer_invalid_event_dict: dict = {}
 
-    def __check_possible_event(self, swimmer: Swimmer, event: SwimMeetEvent) -> bool:
-        # Check gender
-        if event.gender == "F" and swimmer.gender == '1':
+    def __check_limit_times(self, swimmer: Swimmer, event: SwimMeetEvent, age: int) -> bool:
+        if self.best_times is None or event.relay_count > 1 or not event.time_standard_ids:
+            return True
+
+        swimmer_best_times = self.best_times.get(
+            (swimmer.name, swimmer.get_birth_date_iso()[:4]), {})
+        for course, standard in self.meet.time_standards.get_standards(
+                event, swimmer.get_lenex_gender(), age):
+            best_time = swimmer_best_times.get((event.stroke, event.distance, course))
+
+            if standard.standard_type == "MAXIMUM":
+                # Qualifying time, the swimmer has to be faster
+                if best_time is None:
+                    if not self.ALLOW_NT_WITH_LIMIT:
+                        return False
+                elif best_time > standard.swim_time:
+                    return False
+            elif standard.standard_type == "MINIMUM":
+                # The swimmer may not be faster than the limit, NT is allowed
+                if best_time is not None and best_time < standard.swim_time:
+                    return False
+
+        return True
+
+    @staticmethod
+    def __check_gender(gender: str, event_gender: str) -> bool:
+        if event_gender == "F" and gender == '1':
             return False
-        if event.gender == "M" and swimmer.gender == '2':
+        if event_gender == "M" and gender == '2':
             return False
 
-        if event.min_age > swimmer.get_age_at(self.meet.age_date) or \
-                event.max_age < swimmer.get_age_at(self.meet.age_date):
-            return False
+        return True
 
-        # check if we can register with NT
-        # limit times
+    def get_class_events(self, gender: str, age: int) -> tuple[list, list]:
+        '''Get the (valid, invalid) events for a gender and age, without limit times'''
+        key = (gender, age)
+        if key not in self.class_events:
+            # Whole gender/age bands of events are valid or invalid at once
+            valid_set = set()
+            for (event_gender, min_age, max_age), events in \
+                    self.meet.events_by_gender_age.items():
+                if min_age <= age <= max_age and self.__check_gender(gender, event_gender):
+                    valid_set.update(events)
 
-        return True
+            valid_events, invalid_events = [], []
+            for event in self.meet.events:
+                if event in valid_set:
+                    valid_events.append(event)
+                else:
+                    invalid_events.append(event)
+            self.class_events[key] = (valid_events, invalid_events)
+
+        return self.class_events[key]
 
     def generate_possible_events_dict(self, groups_to_use: list[str]):
         '''Check for all the swimmers, which event in the meet they
            can compete in'''
         for group in groups_to_use:
             for swimmer in self.club.get_swimmers_from_group(group):
-                self.swimmer_possible_event_dict[swimmer.name] = []
-                self.swimmer_invalid_event_dict[swimmer.name] = []
-                for event in self.meet.get_all_events():
-                    if self.__check_possible_event(swimmer, event):
-                        self.swimmer_possible_event_dict[swimmer.name].append(event)
-                    else:
-                        self.swimmer_invalid_event_dict[swimmer.name].append(event)
+                age = swimmer.get_age_at(self.meet.age_date)
+                valid_events, invalid_events = self.get_class_events(swimmer.gender, age)
+
+                # Check the qualifying/limit times and if we can register with NT
+                if self.best_times is not None:
+                    limited_events = {event for event in valid_events
+                                      if not self.__check_limit_times(swimmer, event, age)}
+                    if limited_events:
+                        valid_events = [event for event in valid_events
+                                        if event not in limited_events]
+                        valid_set = set(valid_events)
+                        invalid_events = [event for event in self.meet.events
+                                          if event not in valid_set]
+
+                self.swimmer_possible_event_dict[swimmer.name] = valid_events
+                self.swimmer_invalid_event_dict[swimmer.name] = invalid_events
 
     def get_valid_events_for_swimmer(self, swimmer_name: str) -> list[SwimMeetEvent]:
         '''Get a list of all the valid events for a given swimmer'''
@@ -0,0 +1,63 @@
+'''
+Contains the ranking engine, used to construct rankings from the raw results
+when the lenex has no RANKINGS (e.g. club level results) or when the results are
+ranked in other (virtual) age groups than those of the meet.
+'''
+
+from datetime import date
+
+from lib.swim_time import SwimTime
+
+# Results with a status are ranked after all the valid times, in this order
+STATUS_ORDER = {"EXH": 0, "DNF": 1, "DSQ": 2, "DNS": 3, "SICK": 4, "WDR": 5}
+
+def _ranking_key(result: tuple[str, SwimTime, str]) -> tuple[int, int]:
+    _, swim_time, status = result
+    if swim_time is not None and not status:
+        return 0, swim_time
+
+    return 1, STATUS_ORDER.get(status, len(STATUS_ORDER))
+
+def rank_results(results: list[tuple[str, SwimTime, str]]) -> tuple[list[str], list[int]]:
+    '''Rank (result id, swim time, status) on time. Equal times share a placing,
+       results without a time or with a status are put last in order of status.
+       Returns the ordered result ids and their placings'''
+    # Swim times are integers, so this is a plain integer sort
+    ranked = sorted(results, key=_ranking_key)
+
+    placings = []
+    for index, (_, swim_time, status) in enumerate(ranked):
+        if index > 0 and not status and swim_time is not None and \
+           not ranked[index-1][2] and swim_time == ranked[index-1][1]:
+            placings.append(placings[-1])
+        else:
+            placings.append(index + 1)
+
+    return [result[0] for result in ranked], placings
+
+def parse_age_date(value: str) -> date:
+    '''Parse the yyyy-mm-dd AGEDATE value of a meet, None if invalid'''
+    try:
+        return date.fromisoformat(value)
+    except (TypeError, ValueError):
+        return None
+
+def get_age(birth_date: str, age_date: date, age_date_type: str = "YEAR") -> int:
+    '''Age of a swimmer with a yyyy-mm-dd birth date, following the AGEDATE of the
+       meet. For type YEAR (the default in lenex) only the birth year counts'''
+    birth = parse_age_date(birth_date)
+    if birth is None or age_date is None:
+        return None
+
+    age = age_date.year - birth.year
+    if age_date_type == "DATE" and (age_date.month, age_date.day) < (birth.month, birth.day):
+        age -= 1
+
+    return age
+
+def in_age_group(age: int, min_age: int, max_age: int) -> bool:
+    '''Check if an age is in a lenex age group, -1 is unbounded'''
+    if age is None:
+        return min_age == -1 and max_age == -1
+
+    return (min_age == -1 or age >= min_age) and (max_age == -1 or age <= max_age)
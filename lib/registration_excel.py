@@ -99,18 +99,34 @@ class _Sheet:
         return row_number+2
 
 class OverviewRegistrationSheet(_Sheet):
-    '''Sheet containing an overview of the shedule with all the swimmers'''
+    '''Sheet containing an overview of the shedule with all the swimmers.
+       With conditional_cross the invalid events are not styled cell by cell, every
+       swimmer row gets a hidden string of 0/1 flags (one per column) from which a
+       single conditional format crosses out the invalid events'''
+    METADATA_SHEET_NAME = "Metadata"
 
     def __init__(self, workbook: xlsxwriter.Workbook, name: str, groups_to_use: list[str],
-                 log: logging.Logger, club_logo_path: str):
+                 log: logging.Logger, club_logo_path: str, conditional_cross: bool = False):
         super().__init__(workbook, name, groups_to_use, log, club_logo_path)
+        self.conditional_cross = conditional_cross
 
         # Keep track at which location certain elements are placed
         self.event_row_nr: int = -1
         self.event_name_row_nr: int = -1
+        self.first_swimmer_row_nr: int = -1
+        self.last_swimmer_row_nr: int = -1
         self.final_column: int = -1
         self.swimmer_to_row_number: dict = {}
         self.event_to_column_number: dict = {}
+        self.cross_mask: dict[int, list[int]] = {}
+
+        self.styles["cross"] = self.workbook.add_format({'diag_type': 3, 'diag_border': 1,
+                                                         'diag_color': 'black',
+                                                         'bg_color': 'gray'})
+        # Conditional formats can not have a diagonal border, use a hatched fill
+        self.styles["conditional_cross"] = self.workbook.add_format({'pattern': 14,
+                                                                     'fg_color': 'black',
+                                                                     'bg_color': 'gray'})
 
     def __add_structure(self, start_row: int) -> int:
         row_counter = start_row
@@ -144,6 +160,10 @@ class OverviewRegistrationSheet(_Sheet):
 
         self.log.info(','.join(self.groups_to_use) + " added to the register overview sheet")
 
+        # Rows of the group names and swimmers
+        self.first_swimmer_row_nr = start_row
+        self.last_swimmer_row_nr = row_number-1
+
         return row_number-1
 
     def __add_events(self, meet: SwimMeet, start_row_events: int, start_row_swimmers: int,
@@ -163,9 +183,8 @@ class OverviewRegistrationSheet(_Sheet):
                                    session_cell_style)
 
             col_number += 1
-            for event in meet.get_events_in_session(session_name=session):
-                if event.round == "FIN":
-                    continue
+            # Finals will not be included in the overview
+            for event in meet.get_events_in_session(session_name=session, include_finals=False):
                 self.event_to_column_number[event] = col_number
                 self.sheet.write(start_row_events, col_number, f"{event.round} # {event.number}")
                 self.sheet.write(start_row_events+1, col_number, event.gender)
@@ -191,31 +210,100 @@ class OverviewRegistrationSheet(_Sheet):
         # Add the events
         self.__add_events(meet, start_row_events, start_row_swimmers, final_row)
 
-    def cross_invalid_events(self, possible_events: PossibleEvents, club: Club):
+    def add_metadata_sheet(self):
+        '''Persist the swimmer -> row and event -> column mapping in a hidden sheet
+           so filled in registrations can be read back (see RegistrationReader).
+           Every swimmer also gets the crossed out columns, comma separated'''
+        metadata_sheet = self.workbook.add_worksheet(name=self.METADATA_SHEET_NAME)
+        metadata_sheet.hide()
+
+        metadata_sheet.write_row(0, 0, ["sheet", self.name])
+        row_number = 1
+        for swimmer_name, swimmer_row in self.swimmer_to_row_number.items():
+            crossed_columns = ",".join(str(column) for column in
+                                       self.cross_mask.get(swimmer_row, []))
+            metadata_sheet.write_row(row_number, 0, ["swimmer", swimmer_name, swimmer_row,
+                                                     crossed_columns])
+            row_number += 1
+
+        for event, event_column in self.event_to_column_number.items():
+            metadata_sheet.write_row(row_number, 0, ["event", event.number, event_column,
+                                                     event.round])
+            row_number += 1
+
+        self.log.debug(f"Registration metadata written ({row_number} rows)")
+
+    def get_cross_mask(self, possible_events: PossibleEvents) -> dict[int, list[int]]:
+        '''Get the sorted columns of the invalid events for every swimmer row'''
+        cross_mask = {}
+        for swimmer_name, row_number in self.swimmer_to_row_number.items():
+            # Finals are not included in the overview, so they have no column
+            cross_mask[row_number] = sorted(
+                self.event_to_column_number[invalid_event]
+                for invalid_event in possible_events.get_invalid_events_for_swimmer(swimmer_name)
+                if invalid_event in self.event_to_column_number)
+
+        return cross_mask
+
+    def __add_conditional_cross(self, cross_mask: dict[int, list[int]]):
+        '''Write the 0/1 flags of every swimmer row in a hidden helper column and
+           add the conditional format that crosses out the cells flagged 0'''
+        helper_column = self.final_column
+        self.sheet.set_column(helper_column, helper_column, None, None, {'hidden': True})
+
+        for row_number, columns in cross_mask.items():
+            flags = ["1"] * (self.final_column - 1)
+            for column in columns:
+                flags[column-1] = "0"
+            self.sheet.write_string(row_number, helper_column, "".join(flags))
+
+        if not cross_mask:
+            return
+
+        first_row = min(cross_mask)
+        helper_cell = xlsxwriter.utility.xl_rowcol_to_cell(first_row, helper_column,
+                                                           col_abs=True)
+        self.sheet.conditional_format(first_row, 1, max(cross_mask), self.final_column-1,
+                                      {'type': 'formula',
+                                       'criteria': f'=MID({helper_cell},COLUMN()-1,1)="0"',
+                                       'format': self.styles["conditional_cross"]})
+
+    def cross_invalid_events(self, possible_events: PossibleEvents):
         '''In the event/swimmer matrix, cross out the events that the swimmer may 
-           not participate in'''
-        cross_cell_style = self.workbook.add_format({'diag_type': 3, 'diag_border': 1,
-                                                     'diag_color': 'black', 'bg_color': 'gray'})
-        for group in self.groups_to_use:
-            for swimmer_name in club.get_swimmer_names_from_group(group):
-                for invalid_event in possible_events.get_invalid_events_for_swimmer(swimmer_name):
-                    # Finals will not be included in the overview
-                    if invalid_event.round == "FIN":
-                        continue
-                    self.sheet.write(self.swimmer_to_row_number[swimmer_name],
-                                     self.event_to_column_number[invalid_event],
-                                     "", cross_cell_style)
+           not participate in. Adjacent crossed cells are written as one run'''
+        cross_mask = self.get_cross_mask(possible_events)
+        # Kept for the metadata sheet
+        self.cross_mask = cross_mask
+
+        if self.conditional_cross:
+            self.__add_conditional_cross(cross_mask)
+            return
+
+        for row_number in sorted(cross_mask):
+            columns = cross_mask[row_number]
+            run_start = 0
+            for index in range(1, len(columns) + 1):
+                if index < len(columns) and columns[index] == columns[index-1] + 1:
+                    continue
+                self.sheet.write_row(row_number, columns[run_start],
+                                     [""] * (index - run_start), self.styles["cross"])
+                run_start = index
 
 class SummarySheet(_Sheet):
     '''Registration excel sheet to give an overview of the different
-       events that are selected for every swimmer'''
+       events that are selected for every swimmer. With dynamic_array the
+       summary of all the swimmers is a single BYROW formula spilling over the
+       swimmer rows, instead of an array formula per swimmer'''
 
     def __init__(self, workbook: xlsxwriter.Workbook, name: str, groups_to_use: list[str],
-                 log: logging.Logger, club_logo_path: str):
+                 log: logging.Logger, club_logo_path: str, dynamic_array: bool = False):
         super().__init__(workbook, name, groups_to_use, log, club_logo_path)
+        self.dynamic_array = dynamic_array
 
         # Keep track of different row/column numbers
         self.swimmer_to_row_number: dict = {}
+        self.first_swimmer_row_nr: int = -1
+        self.last_swimmer_row_nr: int = -1
 
     def __add_swimmers(self, club: Club, start_row: int):
         '''Add all the groups and swimmers to the first column of the sheet'''
@@ -231,6 +319,7 @@ class SummarySheet(_Sheet):
         self.sheet.set_column(col_number+1, col_number+2, 45)
 
         row_number += 1
+        self.first_swimmer_row_nr = row_number
 
         for group in self.groups_to_use:
             self.sheet.write(row_number, col_number, group, self.styles["group_name"])
@@ -241,8 +330,29 @@ class SummarySheet(_Sheet):
                 self.swimmer_to_row_number[swimmer_name] = row_number
                 row_number += 1
 
+        self.last_swimmer_row_nr = row_number-1
         self.log.info(','.join(self.groups_to_use) + " added to the summary sheet")
 
+    def __add_dynamic_summary(self, register_sheet: OverviewRegistrationSheet):
+        '''One formula for all the swimmers. The group and swimmer rows are in the same
+           order on both sheets, so row i of the spill is row i of the overview'''
+        if self.last_swimmer_row_nr - self.first_swimmer_row_nr != \
+           register_sheet.last_swimmer_row_nr - register_sheet.first_swimmer_row_nr:
+            raise ValueError("The summary and overview sheet have different swimmer rows")
+
+        swimmer_rows = xlsxwriter.utility.xl_range(register_sheet.first_swimmer_row_nr, 2,
+                                                   register_sheet.last_swimmer_row_nr,
+                                                   register_sheet.final_column-1)
+        event_names = xlsxwriter.utility.xl_range_abs(register_sheet.event_name_row_nr, 2,
+                                                      register_sheet.event_name_row_nr,
+                                                      register_sheet.final_column-1)
+        form = f'=_xlfn.BYROW({register_sheet.name}!{swimmer_rows}, ' + \
+               '_xlfn.LAMBDA(_xlpm.swimmer, _xlfn.TEXTJOIN(", ", TRUE, ' + \
+               f'IF(ISBLANK(_xlpm.swimmer), "", {register_sheet.name}!{event_names}))))'
+        self.log.debug(form)
+        self.sheet.write_dynamic_array_formula(self.first_swimmer_row_nr, 1,
+                                               self.last_swimmer_row_nr, 1, form)
+
     def __add_summary(self, club: Club, register_sheet: OverviewRegistrationSheet):
         final_column_letter = xlsxwriter.utility.xl_col_to_name(register_sheet.final_column-1)
 
@@ -264,7 +374,10 @@ class SummarySheet(_Sheet):
         self.__add_swimmers(club, start_row)
 
         # Add the excel formula to create a summary
-        self.__add_summary(club, register_sheet)
+        if self.dynamic_array:
+            self.__add_dynamic_summary(register_sheet)
+        else:
+            self.__add_summary(club, register_sheet)
 
 class ValidEventsSheet(_Sheet):
     '''Registration excel sheet to give an overview of the different
@@ -322,12 +435,19 @@ class ValidEventsSheet(_Sheet):
 
 class RegistrationExcel:
     '''Class to group all the data concering the registration excel'''
-    def __init__(self, log: logging.Logger, meet_name: str, club_logo_path: str):
+    def __init__(self, log: logging.Logger, meet_name: str, club_logo_path: str,
+                 best_times: dict = None, conditional_cross: bool = False,
+                 dynamic_summary: bool = False, class_events: dict = None):
         self.groups_to_use: list[str] = None
         self.log = log
         self.sheets: list[_Sheet] = []
+        self.conditional_cross = conditional_cross
+        self.dynamic_summary = dynamic_summary
+        # Eligibility per (gender, age), possibly shared with other clubs
+        self.class_events: dict = class_events
 
         self.possible_events: PossibleEvents = None
+        self.best_times: dict = best_times
         self.groups_to_use: list[str] = None
         self.club_logo_path: str = club_logo_path
 
@@ -335,10 +455,8 @@ class RegistrationExcel:
         self.__create_empty_excel(meet_name)
 
     def __check_tmp_dir(self):
-        # check tmp folder present
-        if not os.path.isdir("tmp"):
-            os.mkdir("tmp")
-            self.log.debug("Created tmp folder")
+        # check tmp folder present, the registration workers can create it at the same time
+        os.makedirs("tmp", exist_ok=True)
 
     def __create_empty_excel(self, meet_name: str):
         '''Create empty base excel'''
@@ -361,7 +479,7 @@ class RegistrationExcel:
         if self.possible_events is not None:
             return self.possible_events
 
-        self.possible_events = PossibleEvents(meet, club)
+        self.possible_events = PossibleEvents(meet, club, self.best_times, self.class_events)
         self.possible_events.generate_possible_events_dict(self.__get_groups_to_use(club))
 
         return self.possible_events
@@ -377,9 +495,10 @@ class RegistrationExcel:
         possible_events = self.__get_possible_events(meet, club)
 
         ors = OverviewRegistrationSheet(self.workbook, "Inschrijving", groups, self.log,
-                                        self.club_logo_path)
+                                        self.club_logo_path, self.conditional_cross)
         ors.fill_sheet(meet, club)
-        ors.cross_invalid_events(possible_events, club)
+        ors.cross_invalid_events(possible_events)
+        ors.add_metadata_sheet()
         self.sheets.append(ors)
 
     def add_summary_sheet(self, meet: SwimMeet, club: Club):
@@ -398,7 +517,8 @@ class RegistrationExcel:
             raise ValueError("Cannot create a summary if there is not \
                              an overview registration sheet")
 
-        sum_s = SummarySheet(self.workbook, "Summary", groups, self.log, self.club_logo_path)
+        sum_s = SummarySheet(self.workbook, "Summary", groups, self.log, self.club_logo_path,
+                             self.dynamic_summary)
         sum_s.fill_sheet(meet, club, ors)
         self.sheets.append(sum_s)
 
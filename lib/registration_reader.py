@@ -0,0 +1,169 @@
+'''
+Read back a filled in registration excel. The swimmer/event matrix of the
+overview registration sheet is mapped back to entries using the metadata
+that was stored in the hidden metadata sheet when the excel was created.
+'''
+
+import posixpath
+import logging
+
+from zipfile import ZipFile
+
+import xml.etree.ElementTree as ET
+
+from lib.registration_excel import OverviewRegistrationSheet
+
+class RegistrationReader:
+    '''Stream the sheet xml of a registration excel and extract all the filled
+       in swimmer/event cells without loading the complete workbook'''
+    MAIN_NS = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+    REL_NS = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+    PKG_REL_NS = "{http://schemas.openxmlformats.org/package/2006/relationships}"
+
+    def __init__(self, log: logging.Logger, xlsx_path: str):
+        self.log = log
+        self.xlsx_path = xlsx_path
+
+        # Mappings restored from the metadata sheet
+        self.registration_sheet_name: str = None
+        self.row_to_swimmer: dict[int, str] = {}
+        self.column_to_event: dict[int, tuple[int, str]] = {}
+        # Columns of the events a swimmer may not participate in, for every swimmer row
+        self.crossed_columns: dict[int, set[int]] = {}
+
+        self.shared_strings: list[str] = []
+        self.sheet_paths: dict[str, str] = {}
+
+    def __load_sheet_paths(self, zipped_file: ZipFile):
+        '''Map every sheet name to the path of its xml part in the zip'''
+        rel_targets = {}
+        with zipped_file.open("xl/_rels/workbook.xml.rels") as fi:
+            for rel in ET.parse(fi).getroot():
+                rel_targets[rel.attrib["Id"]] = rel.attrib["Target"]
+
+        with zipped_file.open("xl/workbook.xml") as fi:
+            workbook_root = ET.parse(fi).getroot()
+
+        for sheet in workbook_root.iter(f"{self.MAIN_NS}sheet"):
+            target = rel_targets[sheet.attrib[f"{self.REL_NS}id"]]
+            # Targets are relative to xl/, unless they are absolute
+            if target.startswith("/"):
+                target = target[1:]
+            else:
+                target = posixpath.normpath(f"xl/{target}")
+            self.sheet_paths[sheet.attrib["name"]] = target
+
+    def __load_shared_strings(self, zipped_file: ZipFile):
+        if "xl/sharedStrings.xml" not in zipped_file.namelist():
+            return
+
+        with zipped_file.open("xl/sharedStrings.xml") as fi:
+            for _, node in ET.iterparse(fi):
+                if node.tag == f"{self.MAIN_NS}si":
+                    # Rich text strings are split over multiple t nodes
+                    self.shared_strings.append("".join(node.itertext()))
+                    node.clear()
+
+    def __iter_cells(self, zipped_file: ZipFile, sheet_name: str):
+        '''Yield (row, column, value) for all the non empty cells of a sheet.
+           Row and column are zero indexed, like in xlsxwriter'''
+        sheet_path = self.sheet_paths.get(sheet_name)
+        if sheet_path is None:
+            raise ValueError(f"Sheet {sheet_name} not found in {self.xlsx_path}")
+
+        cell_tag = f"{self.MAIN_NS}c"
+        value_tag = f"{self.MAIN_NS}v"
+        inline_tag = f"{self.MAIN_NS}is"
+        row_tag = f"{self.MAIN_NS}row"
+
+        with zipped_file.open(sheet_path) as fi:
+            for _, node in ET.iterparse(fi):
+                if node.tag == row_tag:
+                    node.clear()
+                    continue
+                if node.tag != cell_tag:
+                    continue
+
+                cell_type = node.attrib.get("t", "n")
+                if cell_type == "inlineStr":
+                    inline_node = node.find(inline_tag)
+                    value = "" if inline_node is None else "".join(inline_node.itertext())
+                else:
+                    value_node = node.find(value_tag)
+                    value = None if value_node is None else value_node.text
+                    if value is not None and cell_type == "s":
+                        value = self.shared_strings[int(value)]
+
+                if value is None or value.strip() == "":
+                    continue
+
+                row, column = self.__split_cell_reference(node.attrib["r"])
+                yield row, column, value
+
+    @staticmethod
+    def __split_cell_reference(reference: str) -> tuple[int, int]:
+        '''Convert a cell reference like AB12 into zero indexed (row, column)'''
+        column = 0
+        index = 0
+        for index, char in enumerate(reference):
+            if char.isdigit():
+                break
+            column = column * 26 + ord(char) - 64
+
+        return int(reference[index:]) - 1, column - 1
+
+    def __load_metadata(self, zipped_file: ZipFile):
+        rows: dict[int, dict[int, str]] = {}
+        for row, column, value in self.__iter_cells(zipped_file,
+                                                    OverviewRegistrationSheet.METADATA_SHEET_NAME):
+            rows.setdefault(row, {})[column] = value
+
+        for row in rows.values():
+            kind = row.get(0)
+            if kind == "sheet":
+                self.registration_sheet_name = row[1]
+            elif kind == "swimmer":
+                swimmer_row = int(float(row[2]))
+                self.row_to_swimmer[swimmer_row] = row[1]
+                # A single crossed column is stored as a number
+                self.crossed_columns[swimmer_row] = \
+                    {int(float(column)) for column in row.get(3, "").split(",") if column}
+            elif kind == "event":
+                self.column_to_event[int(float(row[2]))] = (int(float(row[1])), row.get(3, ""))
+
+        if self.registration_sheet_name is None:
+            raise ValueError(f"No registration metadata found in {self.xlsx_path}")
+
+        self.log.debug(f"Loaded metadata for {len(self.row_to_swimmer)} swimmers and " + \
+                       f"{len(self.column_to_event)} events")
+
+    def read_entries(self) -> dict[str, list[int]]:
+        '''Get the event numbers that are filled in for every swimmer. Entries in
+           crossed out cells (events the swimmer may not participate in) are skipped'''
+        entries: dict[str, list[int]] = {}
+        number_of_rejected = 0
+        with ZipFile(self.xlsx_path, 'r') as zipped_file:
+            self.__load_sheet_paths(zipped_file)
+            self.__load_shared_strings(zipped_file)
+            self.__load_metadata(zipped_file)
+
+            for row, column, _ in self.__iter_cells(zipped_file, self.registration_sheet_name):
+                swimmer_name = self.row_to_swimmer.get(row)
+                event = self.column_to_event.get(column)
+                if swimmer_name is None or event is None:
+                    continue
+
+                if column in self.crossed_columns.get(row, ()):
+                    self.log.warning(f"Skipping event {event[0]} of {swimmer_name}, " + \
+                                     "the swimmer may not participate in it")
+                    number_of_rejected += 1
+                    continue
+
+                entries.setdefault(swimmer_name, []).append(event[0])
+
+        self.log.info(f"Read {sum(len(e) for e in entries.values())} entries for " + \
+                      f"{len(entries)} swimmers from {self.xlsx_path}" + \
+                      (f", skipped {number_of_rejected} invalid entries"
+                       if number_of_rejected else ""))
+
+        return entries
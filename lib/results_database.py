@@ -0,0 +1,183 @@
+'''
+Contains the results database. Every processed results lenex is ingested into a
+local sqlite database, which is used to look up personal bests and progressions.
+'''
+
+import os
+import sqlite3
+import logging
+
+from lib.meet_management import MeetResults
+from lib.swim_time import SwimTime
+
+class ResultsDatabase:
+    '''Local sqlite store with the individual results of all the ingested meets'''
+    DEFAULT_PATH = "data/results.db"
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS meets (
+            meet_id INTEGER PRIMARY KEY,
+            name TEXT NOT NULL,
+            city TEXT NOT NULL,
+            start_date TEXT NOT NULL,
+            course TEXT NOT NULL,
+            UNIQUE (name, city, start_date)
+        );
+        CREATE TABLE IF NOT EXISTS results (
+            meet_id INTEGER NOT NULL REFERENCES meets(meet_id),
+            athlete TEXT NOT NULL,
+            birth_date TEXT NOT NULL,
+            club TEXT NOT NULL,
+            stroke TEXT NOT NULL,
+            distance INTEGER NOT NULL,
+            course TEXT NOT NULL,
+            round TEXT NOT NULL,
+            swim_time INTEGER NOT NULL,
+            swim_date TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_results_athlete_event
+            ON results (athlete, stroke, distance, course, swim_time);
+        CREATE INDEX IF NOT EXISTS idx_results_meet ON results (meet_id);
+    """
+
+    def __init__(self, log: logging.Logger, db_path: str = DEFAULT_PATH):
+        self.log = log
+        self.db_path = db_path
+
+        if not os.path.isdir(os.path.dirname(db_path) or "."):
+            os.mkdir(os.path.dirname(db_path))
+
+        self.connection = sqlite3.connect(db_path)
+        self.__migrate()
+        self.connection.executescript(self.SCHEMA)
+
+    def __migrate(self):
+        '''Meets used to be unique on name only, such that a yearly meet replaced
+           the results of the previous years. The start date of the old meets is
+           the date of their first result'''
+        columns = [row[1] for row in self.connection.execute("PRAGMA table_info(meets)")]
+        if not columns or "start_date" in columns:
+            return
+
+        self.log.info("Migrating the meets of the results database")
+        # Keep the references of the results to meets when renaming
+        self.connection.execute("PRAGMA legacy_alter_table = ON")
+        with self.connection:
+            self.connection.execute("ALTER TABLE meets RENAME TO meets_old")
+            self.connection.executescript(self.SCHEMA)
+            self.connection.execute(
+                "INSERT INTO meets (meet_id, name, city, start_date, course) " + \
+                "SELECT meet_id, name, '', COALESCE((SELECT MIN(swim_date) FROM results " + \
+                "WHERE results.meet_id = meets_old.meet_id), ''), course FROM meets_old")
+            self.connection.execute("DROP TABLE meets_old")
+        self.connection.execute("PRAGMA legacy_alter_table = OFF")
+
+    def __iter_result_rows(self, meet_results: MeetResults, meet_id: int):
+        for result_entry in meet_results.result_ids.values():
+            event_entry = meet_results.event_ids.get(result_entry.event_id)
+            athlete_entry = meet_results.athlete_ids.get(result_entry.athlete_id)
+
+            # DSQ/DNS/NT results have no time to compare
+            if event_entry is None or athlete_entry is None or result_entry.swim_time is None \
+               or result_entry.status:
+                continue
+
+            yield (meet_id, athlete_entry.swimmer_name, athlete_entry.birth_date,
+                   athlete_entry.club, event_entry.stroke, event_entry.distance,
+                   meet_results.course, event_entry.event_round, int(result_entry.swim_time),
+                   event_entry.date)
+
+    def ingest(self, meet_results: MeetResults) -> int:
+        '''Add all the individual results of the meet in one transaction. A meet is
+           identified by its name, city and start date, ingesting the same meet
+           again replaces the previous results of that meet. Migrated meets have no
+           city, they are matched on name and start date and get the city'''
+        meet_results.extract_results()
+        meet_key = (meet_results.meet_name, meet_results.city,
+                    min((event.date for event in meet_results.event_ids.values()
+                         if event.date), default=""))
+
+        with self.connection:
+            cursor = self.connection.execute(
+                "SELECT meet_id FROM meets WHERE name = ? AND city = ? AND start_date = ?",
+                meet_key)
+            row = cursor.fetchone()
+            if row is None:
+                cursor = self.connection.execute(
+                    "SELECT meet_id FROM meets WHERE name = ? AND city = '' AND start_date = ?",
+                    (meet_key[0], meet_key[2]))
+                row = cursor.fetchone()
+                if row is not None:
+                    self.connection.execute(
+                        "UPDATE meets SET city = ? WHERE meet_id = ?", (meet_key[1],) + row)
+            if row is not None:
+                self.connection.execute("DELETE FROM results WHERE meet_id = ?", row)
+                meet_id = row[0]
+            else:
+                meet_id = self.connection.execute(
+                    "INSERT INTO meets (name, city, start_date, course) VALUES (?, ?, ?, ?)",
+                    meet_key + (meet_results.course,)).lastrowid
+
+            cursor = self.connection.executemany(
+                "INSERT INTO results VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                self.__iter_result_rows(meet_results, meet_id))
+
+        self.log.info(f"Ingested {cursor.rowcount} results of {meet_results.meet_name}")
+
+        return cursor.rowcount
+
+    def get_personal_bests(self, club: str = None) -> \
+            dict[tuple[str, str], dict[tuple[str, int, str], SwimTime]]:
+        '''Get the best time of every swimmer for every (stroke, distance, course),
+           optionally of the swimmers of one club (lenex club code). Swimmers are
+           identified by their name and birth year (yyyy)'''
+        personal_bests: dict[tuple[str, str], dict[tuple[str, int, str], SwimTime]] = {}
+        query = "SELECT athlete, substr(birth_date, 1, 4) AS birth_year, stroke, distance, " + \
+                "course, MIN(swim_time) FROM results "
+        parameters = ()
+        if club is not None:
+            query += "WHERE club = ? "
+            parameters = (club,)
+        cursor = self.connection.execute(
+            query + "GROUP BY athlete, birth_year, stroke, distance, course", parameters)
+
+        for athlete, birth_year, stroke, distance, course, swim_time in cursor:
+            personal_bests.setdefault((athlete, birth_year), {})[(stroke, distance, course)] = \
+                SwimTime(swim_time)
+
+        return personal_bests
+
+    def get_personal_best(self, athlete: str, stroke: str, distance: int,
+                          course: str, birth_year: str = None) -> SwimTime:
+        '''Get the best time of a swimmer for an event, None if unknown. Pass the
+           birth year (yyyy) to tell apart swimmers with the same name'''
+        query = "SELECT MIN(swim_time) FROM results " + \
+                "WHERE athlete = ? AND stroke = ? AND distance = ? AND course = ?"
+        parameters = (athlete, stroke, distance, course)
+        if birth_year is not None:
+            query += " AND substr(birth_date, 1, 4) = ?"
+            parameters += (birth_year,)
+        swim_time = self.connection.execute(query, parameters).fetchone()[0]
+
+        return None if swim_time is None else SwimTime(swim_time)
+
+    def get_progression(self, athlete: str, stroke: str, distance: int, course: str,
+                        birth_year: str = None) -> list[tuple[str, str, str, SwimTime]]:
+        '''Get all the (date, meet, round, time) of a swimmer for an event, oldest first.
+           Pass the birth year (yyyy) to tell apart swimmers with the same name'''
+        query = "SELECT r.swim_date, m.name, r.round, r.swim_time FROM results r " + \
+                "JOIN meets m ON m.meet_id = r.meet_id " + \
+                "WHERE r.athlete = ? AND r.stroke = ? AND r.distance = ? AND r.course = ? "
+        parameters = (athlete, stroke, distance, course)
+        if birth_year is not None:
+            query += "AND substr(r.birth_date, 1, 4) = ? "
+            parameters += (birth_year,)
+        cursor = self.connection.execute(
+            query + "ORDER BY r.swim_date, r.swim_time", parameters)
+
+        return [(swim_date, meet, event_round, SwimTime(swim_time))
+                for swim_date, meet, event_round, swim_time in cursor]
+
+    def close(self):
+        '''Close the connection to the database'''
+        self.connection.close()
@@ -6,23 +6,36 @@ import os
 import logging
 import xlsxwriter
 
-import xlsxwriter.exceptions
-
-from lib.meet_management import RankingsEntry
+from lib.meet_management import RankingsEntry, RelayLegEntry
+from lib.splits import PacingEntry
+from lib.points import PointsCalculator
+from lib.interclub import InterclubScores
+from lib.swim_time import SwimTime
+from lib.season_report import SeasonReport
+from lib.xlsx_parts import ResultsWorkbookWriter, PLACE_NUM_FORMAT, get_sheet_name
 
 
 class ResultsExcel:
-    '''Class to display rankings generated by the meet results class in an excel'''
+    '''Class to display rankings generated by the meet results class in an excel.
+       In parallel mode the meet sheets are rendered by worker processes when
+       closing, only meet sheets are supported in this mode. In compact mode the
+       placings are written as numbers instead of strings'''
     IND_RESULTS_COL=1
     RELAY_RESULTS_COL=5
 
-    def __init__(self, log: logging.Logger, excel_name: str) -> None:
+    def __init__(self, log: logging.Logger, excel_name: str, parallel: bool = False,
+                 compact: bool = False) -> None:
         self.log = log
+        self.compact = compact
 
         self.file_path: str = ""
         self.workbook: xlsxwriter.Workbook = None
+        self.parallel_writer: ResultsWorkbookWriter = None
+        self.styles: dict = {}
 
-        self.__create_empty_excel(excel_name)
+        self.__create_empty_excel(excel_name, parallel)
+        if not parallel:
+            self.__create_styles()
 
     def __check_tmp_dir(self):
         # check tmp folder present
@@ -30,16 +43,40 @@ class ResultsExcel:
             os.mkdir("tmp")
             self.log.debug("Created tmp folder")
 
-    def __create_empty_excel(self, excel_name: str):
+    def __create_empty_excel(self, excel_name: str, parallel: bool):
         '''Create empty base excel'''
         # Check if the tmp folder is present
         self.__check_tmp_dir()
         # String sanitizing
         self.file_path = f"tmp/{excel_name}.xlsx"
         # Create the excel
-        self.workbook = xlsxwriter.Workbook(self.file_path)
+        if parallel:
+            self.parallel_writer = ResultsWorkbookWriter(self.log, self.file_path, self.compact)
+        else:
+            self.workbook = xlsxwriter.Workbook(self.file_path)
         self.log.debug("Excel initialized")
 
+    def __check_not_parallel(self):
+        if self.parallel_writer is not None:
+            raise ValueError("Only meet results can be added to a parallel results excel")
+
+    def __create_styles(self):
+        '''Styles for the rankings, every style has a variant for the time cells'''
+        self.styles["bold"] = self.workbook.add_format({'bold': True})
+
+        podium_colors = ["#FDDC5C", "#D7D7D7", "#a77044"]
+        self.styles["podium"] = [self.workbook.add_format({"bg_color": c}) for c in podium_colors]
+        self.styles["podium_time"] = [self.workbook.add_format(
+                                          {"bg_color": c, "num_format": SwimTime.EXCEL_NUM_FORMAT})
+                                      for c in podium_colors]
+        self.styles["normal"] = self.workbook.add_format()
+        self.styles["normal_time"] = self.workbook.add_format(
+            {"num_format": SwimTime.EXCEL_NUM_FORMAT})
+        self.styles["podium_place"] = [self.workbook.add_format(
+                                           {"bg_color": c, "num_format": PLACE_NUM_FORMAT})
+                                       for c in podium_colors]
+        self.styles["normal_place"] = self.workbook.add_format({"num_format": PLACE_NUM_FORMAT})
+
     def __structure_sheet(self, sheet) -> None:
         # 0th column and row very small for cleanness
         sheet.set_column(0, 0, 3)
@@ -80,25 +117,32 @@ class ResultsExcel:
                               event_ranking: list[RankingsEntry],
                               row_number: int, col_number: int) -> int:
         # Write the event name
-        bold_s = self.workbook.add_format({'bold': True})
         sheet.merge_range(row_number, col_number, row_number, col_number+2,
-                          event_name, bold_s)
-
-        gold_bg_s = self.workbook.add_format({"bg_color": "#FDDC5C"})
-        silver_bg_s = self.workbook.add_format({"bg_color": "#D7D7D7"})
-        broze_bg_s = self.workbook.add_format({"bg_color": "#a77044"})
-        podium_s = [gold_bg_s, silver_bg_s, broze_bg_s]
-        normal_s = self.workbook.add_format()
+                          event_name, self.styles["bold"])
 
         for ranking_entry in event_ranking:
             if ranking_entry.placing < 4:
-                style = podium_s[int(ranking_entry.placing)-1]
+                style = self.styles["podium"][int(ranking_entry.placing)-1]
+                time_style = self.styles["podium_time"][int(ranking_entry.placing)-1]
+                place_style = self.styles["podium_place"][int(ranking_entry.placing)-1]
             else:
-                style = normal_s
+                style = self.styles["normal"]
+                time_style = self.styles["normal_time"]
+                place_style = self.styles["normal_place"]
             row_number += 1
-            sheet.write(row_number, col_number, f"{ranking_entry.placing}.", style)
+            # Numeric placings display the same but do not end up in the shared strings
+            if self.compact:
+                sheet.write_number(row_number, col_number, ranking_entry.placing, place_style)
+            else:
+                sheet.write(row_number, col_number, f"{ranking_entry.placing}.", style)
             sheet.write(row_number, col_number+1, f"{ranking_entry.swimmer_name}", style)
-            sheet.write(row_number, col_number+2, f"{ranking_entry.swim_time}", style)
+
+            # Times are written as native excel times
+            if ranking_entry.swim_time is None:
+                sheet.write(row_number, col_number+2, "?", style)
+            else:
+                sheet.write_number(row_number, col_number+2, ranking_entry.swim_time.to_excel(),
+                                   time_style)
 
         return row_number + 2
 
@@ -108,13 +152,14 @@ class ResultsExcel:
         '''Add the rankings of the individual numbers and the relays to the excel
             create a sheet with the meetname, do some structuring of the sheet
             and add the results'''
+        # The sheet is rendered when closing
+        if self.parallel_writer is not None:
+            self.parallel_writer.add_results(rankings_individual, rankings_relay, meet_name)
+            return
+
         # Create empty sheet
-        try:
-            sheet = self.workbook.add_worksheet(name=meet_name)
-        except xlsxwriter.exceptions.DuplicateWorksheetName:
-            sheet = self.workbook.add_worksheet(name=f"{meet_name}_V2")
-        except xlsxwriter.exceptions.InvalidWorksheetName:
-            sheet = self.workbook.add_worksheet()
+        sheet = self.workbook.add_worksheet(name=get_sheet_name(
+            meet_name, {worksheet.name for worksheet in self.workbook.worksheets()}))
 
         # Set column/row sizes
         self.__structure_sheet(sheet)
@@ -136,7 +181,130 @@ class ResultsExcel:
                                                     event_ranking, row_number,
                                                     self.RELAY_RESULTS_COL)
 
+    def __add_table_sheet(self, sheet_name: str, headers: list[str], rows: list[list],
+                          column_widths: list[int]) -> None:
+        '''Add a sheet with a header row and one row per entry'''
+        sheet = self.workbook.add_worksheet(name=sheet_name)
+        for col_number, width in enumerate(column_widths):
+            sheet.set_column(col_number, col_number, width)
+
+        sheet.write_row(0, 0, headers, self.styles["bold"])
+        for row_number, row in enumerate(rows, 1):
+            sheet.write_row(row_number, 0, row)
+            # Times are written as native excel times
+            for col_number, value in enumerate(row):
+                if isinstance(value, SwimTime):
+                    sheet.write_number(row_number, col_number, value.to_excel(),
+                                       self.styles["normal_time"])
+
+        sheet.freeze_panes(1, 0)
+
+    def add_season_report(self, season_report: SeasonReport) -> None:
+        '''Add the summary sheets of a season report: medal tables per swimmer, club
+           and age group, the best placing per event and the swims per round'''
+        self.__check_not_parallel()
+
+        medal_headers = ["Gold", "Silver", "Bronze", "Total"]
+        for sheet_name, name_header, table in [("Medals swimmers", "Swimmer",
+                                                season_report.medals_swimmers),
+                                               ("Medals clubs", "Club",
+                                                season_report.medals_clubs),
+                                               ("Medals age groups", "Age group",
+                                                season_report.medals_age_groups)]:
+            rows = [[name] + medals + [sum(medals)]
+                    for name, medals in SeasonReport.sorted_medal_table(table)]
+            self.__add_table_sheet(sheet_name, [name_header] + medal_headers, rows,
+                                   [35, 8, 8, 8, 8])
+
+        rows = [[swimmer, event, placing, meet_name] for (swimmer, event), (placing, meet_name)
+                in sorted(season_report.best_placings.items())]
+        self.__add_table_sheet("Best placings", ["Swimmer", "Event", "Best placing", "Meet"],
+                               rows, [35, 30, 12, 40])
+
+        rounds = sorted({r for counts in season_report.round_counts.values() for r in counts})
+        rows = [[swimmer] + [counts.get(r, 0) for r in rounds] + [sum(counts.values())]
+                for swimmer, counts in sorted(season_report.round_counts.items())]
+        self.__add_table_sheet("Rounds", ["Swimmer"] + rounds + ["Total"], rows,
+                               [35] + [8] * (len(rounds) + 1))
+
+        self.log.info(f"Season report of {len(season_report.meet_names)} meets added")
+
+    def add_points_rankings(self, points: PointsCalculator) -> None:
+        '''Add the points sheets: the best result of every swimmer and all the
+           results, both ranked on points'''
+        self.__check_not_parallel()
+
+        headers = ["Points", "Swimmer", "Club", "Event", "Time", "Meet"]
+        widths = [8, 35, 30, 20, 10, 40]
+        for sheet_name, entries in [("Best points", points.get_best_points_per_swimmer()),
+                                    ("Points ranking", points.get_points_ranking())]:
+            rows = [[entry.points, entry.swimmer_name, entry.club, entry.event_name,
+                     entry.swim_time, entry.meet_name] for entry in entries]
+            self.__add_table_sheet(sheet_name, headers, rows, widths)
+
+        self.log.info(f"Points of {len(points.entries)} results added")
+
+    def add_interclub_standings(self, scores: InterclubScores) -> None:
+        '''Add the interclub standings, with the totals per gender and per age group'''
+        self.__check_not_parallel()
+
+        standings = scores.get_standings()
+        for sheet_name, totals in [("Standings", scores.gender_totals),
+                                   ("Standings age groups", scores.age_group_totals)]:
+            columns = sorted({column for _, column in totals})
+            rows = [[place, club] + [totals[(club, column)] for column in columns] + [total]
+                    for place, club, total in standings]
+            self.__add_table_sheet(sheet_name, ["Place", "Club"] + columns + ["Total"], rows,
+                                   [8, 35] + [10] * (len(columns) + 1))
+
+        self.log.info(f"Interclub standings of {len(standings)} clubs added")
+
+    def add_pacing_sheets(self, swimmer_pacing: dict[str, list[PacingEntry]]) -> None:
+        '''Add a pacing sheet per swimmer: the lap times of every result and below
+           them the difference (in seconds) of every lap with an even paced lap'''
+        self.__check_not_parallel()
+
+        sheet_names = set()
+        for swimmer_name, pacing_entries in sorted(swimmer_pacing.items()):
+            # Sheet names are limited to 31 characters and have to be unique
+            sheet_name = swimmer_name[:31]
+            if sheet_name in sheet_names:
+                sheet_name = f"{swimmer_name[:28]}_{len(sheet_names)}"[:31]
+            sheet_names.add(sheet_name)
+
+            number_of_laps = max(len(entry.lap_times) for entry in pacing_entries)
+            rows = []
+            for entry in pacing_entries:
+                rows.append([entry.event_name, entry.swim_time, round(entry.fade, 3)] + \
+                            [SwimTime(lap_time) for lap_time in entry.lap_times])
+                rows.append(["", "", "Delta"] + [delta / 100 for delta in entry.lap_deltas])
+
+            self.__add_table_sheet(sheet_name, ["Event", "Time", "Fade"] + \
+                                   [f"Lap {lap}" for lap in range(1, number_of_laps + 1)],
+                                   rows, [20, 10, 8] + [10] * number_of_laps)
+
+        self.log.info(f"Pacing sheets of {len(swimmer_pacing)} swimmers added")
+
+    def add_relay_legs_sheet(self, swimmer_relay_legs: dict[str, list[RelayLegEntry]]) -> None:
+        '''Add a sheet with the relay legs of every swimmer, the leg time and the
+           reaction time (in seconds) of every leg'''
+        self.__check_not_parallel()
+
+        rows = []
+        for swimmer_name, relay_legs in sorted(swimmer_relay_legs.items()):
+            rows += [[swimmer_name, entry.event_name, entry.leg, entry.leg_time,
+                      None if entry.reaction_time is None else entry.reaction_time / 100,
+                      entry.team] for entry in relay_legs]
+
+        self.__add_table_sheet("Relay legs", ["Swimmer", "Event", "Leg", "Leg time",
+                                              "Reaction", "Team"],
+                               rows, [35, 20, 6, 10, 10, 75])
+        self.log.info(f"Relay legs of {len(swimmer_relay_legs)} swimmers added")
+
     def close(self) -> None:
         '''Close and save the results excel'''
-        self.workbook.close()
+        if self.parallel_writer is not None:
+            self.parallel_writer.close()
+        else:
+            self.workbook.close()
         print(f"Excel saved at {self.file_path}")
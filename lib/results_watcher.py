@@ -0,0 +1,174 @@
+'''
+Contains the results watcher, used during a meet to keep a podium excel up to
+date while the organizer republishes the results lenexes (.lxf) in a folder.
+'''
+
+import os
+import glob
+import time
+import hashlib
+import logging
+
+from zipfile import BadZipFile
+
+import xml.etree.ElementTree as ET
+import xlsxwriter.exceptions
+
+from lib.meet_management import LenexHelper, MeetResults
+from lib.lenex_index import load_meet_results
+from lib.results_excel import ResultsExcel
+
+class ResultsWatcher:
+    '''Poll a folder with lenexes and rewrite the results excel when the
+       rankings of an event changed. A changed lenex is parsed completely and the
+       excel is rewritten completely, replacing the previous one atomically so it
+       can be opened or copied at any time during the meet. Lenexes that can not be
+       loaded and excels that can not be written are retried on the next poll'''
+    def __init__(self, log: logging.Logger, watch_dir: str, excel_name: str,
+                 filters: list[str], poll_interval: float = 2.0, backend: str = "etree"):
+        self.log = log
+        self.watch_dir = watch_dir
+        self.excel_name = excel_name
+        self.filters = filters
+        self.poll_interval = poll_interval
+        self.backend = backend
+
+        # Lenex path -> (mtime, size) and content hash of the last parsed version
+        self.__file_stats: dict[str, tuple[float, int]] = {}
+        self.__file_hashes: dict[str, str] = {}
+        # Lenex path -> last results of its meets
+        self.meet_results: dict[str, list[MeetResults]] = {}
+        # (lenex path, meet name, ranking name) -> rankings, to find the changed events
+        self.__rankings: dict[tuple[str, str, str], tuple] = {}
+        # The last write failed, the excel is outdated
+        self.__write_pending = False
+
+    @staticmethod
+    def __hash_file(path: str) -> str:
+        file_hash = hashlib.sha1()
+        with open(path, "rb") as fi:
+            for chunk in iter(lambda: fi.read(1 << 20), b""):
+                file_hash.update(chunk)
+
+        return file_hash.hexdigest()
+
+    def __get_changed_files(self) -> list[str]:
+        '''Lenexes that are new or have a new content, a lenex is only hashed when
+           its modification time or size changed'''
+        changed_files = []
+        for path in sorted(glob.glob(os.path.join(self.watch_dir, "*.lxf"))):
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                # Removed while polling
+                continue
+
+            file_stat = (stat.st_mtime, stat.st_size)
+            if self.__file_stats.get(path) == file_stat:
+                continue
+            self.__file_stats[path] = file_stat
+
+            file_hash = self.__hash_file(path)
+            if self.__file_hashes.get(path) != file_hash:
+                self.__file_hashes[path] = file_hash
+                changed_files.append(path)
+
+        return changed_files
+
+    def __get_changed_events(self, path: str, meets: list[MeetResults]) -> list[str]:
+        '''Compare the rankings with those of the previous version of the lenex'''
+        rankings = {}
+        for meet_results in meets:
+            for results in [meet_results.results, meet_results.results_relays]:
+                for ranking_name, ranking in results.items():
+                    rankings[(path, meet_results.meet_name, ranking_name)] = tuple(
+                        (entry.placing, entry.swim_time, entry.swimmer_name, entry.club)
+                        for entry in ranking)
+
+        previous_keys = {key for key in self.__rankings if key[0] == path}
+        changed_events = [key[2] for key, ranking in rankings.items()
+                          if self.__rankings.get(key) != ranking]
+        # Events that disappeared from the lenex (e.g. results withdrawn)
+        changed_events += [key[2] for key in previous_keys - set(rankings)]
+
+        for key in previous_keys:
+            del self.__rankings[key]
+        self.__rankings.update(rankings)
+
+        return changed_events
+
+    def __load_lenex(self, path: str) -> list[MeetResults]:
+        lenex = LenexHelper(self.log, self.watch_dir)
+        lenex.load_lenex(path)
+        # The lef of a republished lenex has to be extracted again
+        lenex.extract_lef_from_lenex(force=True)
+
+        return load_meet_results(self.log, lenex.get_lef_path(), self.filters,
+                                 backend=self.backend)
+
+    def write_excel(self):
+        '''Write the rankings of all the lenexes, the previous excel is only
+           replaced once the new one is complete'''
+        excel = ResultsExcel(self.log, f"{self.excel_name}.partial")
+        for path in sorted(self.meet_results):
+            for meet_results in self.meet_results[path]:
+                excel.add_results_to_excel(meet_results.results, meet_results.results_relays,
+                                           meet_results.meet_name)
+        excel.close()
+
+        os.replace(excel.file_path, f"tmp/{self.excel_name}.xlsx")
+
+    def poll(self) -> bool:
+        '''Check the folder once and update the excel if needed, returns if the
+           excel was rewritten'''
+        changed = self.__write_pending
+        for path in self.__get_changed_files():
+            start_time = time.perf_counter()
+            try:
+                meets = self.__load_lenex(path)
+            except (BadZipFile, ET.ParseError, OSError, ValueError) as e:
+                # E.g. a lenex that is still being copied, retried on the next poll
+                self.log.warning(f"Could not load {os.path.basename(path)}: {e}")
+                self.__file_stats.pop(path, None)
+                self.__file_hashes.pop(path, None)
+                continue
+            self.meet_results[path] = meets
+
+            changed_events = self.__get_changed_events(path, meets)
+            self.log.info(f"{os.path.basename(path)}: {len(changed_events)} changed events " + \
+                          f"(parsed in {time.perf_counter() - start_time:.2f}s)")
+            for event_name in changed_events:
+                self.log.debug(f"Changed: {event_name}")
+            changed = changed or len(changed_events) > 0
+
+        # Lenexes removed from the folder
+        for path in [path for path in self.meet_results if not os.path.exists(path)]:
+            self.log.info(f"{os.path.basename(path)} removed")
+            del self.meet_results[path]
+            self.__file_stats.pop(path, None)
+            self.__file_hashes.pop(path, None)
+            self.__get_changed_events(path, [])
+            changed = True
+
+        if not changed:
+            return False
+
+        try:
+            self.write_excel()
+        except (OSError, xlsxwriter.exceptions.FileCreateError) as e:
+            # E.g. the excel is opened in Excel, written again on the next poll
+            self.log.warning(f"Could not write the excel: {e}")
+            self.__write_pending = True
+            return False
+
+        self.__write_pending = False
+        return True
+
+    def watch(self, max_polls: int = None):
+        '''Poll until interrupted (or max_polls times)'''
+        self.log.info(f"Watching {self.watch_dir} for lenexes")
+        number_of_polls = 0
+        while max_polls is None or number_of_polls < max_polls:
+            self.poll()
+            number_of_polls += 1
+            time.sleep(self.poll_interval)
@@ -0,0 +1,113 @@
+'''
+Contains the season report, aggregating the rankings of many meets into medal
+tables, best placings and the number of swims per round
+'''
+
+import os
+import logging
+
+from concurrent.futures import ProcessPoolExecutor
+
+from lib.meet_management import LenexHelper, MeetResults
+from lib.lenex_index import LenexIndex
+
+def _load_meet_results(lenex_path: str, filters: list[str], log_name: str,
+                       backend: str = "etree") -> list[MeetResults]:
+    '''Worker: load a results lenex and construct the rankings of all its meets'''
+    log = logging.getLogger(log_name)
+
+    lenex = LenexHelper(log, os.path.dirname(lenex_path))
+    lenex.load_lenex(lenex_path)
+    lenex.extract_lef_from_lenex()
+
+    all_meet_results = []
+    lenex_index = LenexIndex(log, lenex.get_lef_path(), backend)
+    for meet_index in range(len(lenex_index.meet_ranges)):
+        meet_results = MeetResults(log, lenex_index.get_meet_root(meet_index))
+        meet_results.construct_rankings(filters)
+        # Only the rankings are sent back to the main process
+        meet_results.release_xml()
+        all_meet_results.append(meet_results)
+    lenex_index.close()
+
+    return all_meet_results
+
+class SeasonReport:
+    '''Aggregate the rankings of multiple meets. Every meet is added with a single
+       pass over its rankings'''
+    # Only in these rounds a podium place is a medal
+    MEDAL_ROUNDS = ["TIM", "FIN"]
+
+    def __init__(self, log: logging.Logger):
+        self.log = log
+        self.meet_names: list[str] = []
+
+        # name -> [gold, silver, bronze]
+        self.medals_swimmers: dict[str, list[int]] = {}
+        self.medals_clubs: dict[str, list[int]] = {}
+        self.medals_age_groups: dict[str, list[int]] = {}
+        # (swimmer, gender + event + age group) -> (best placing, meet name)
+        self.best_placings: dict[tuple[str, str], tuple[int, str]] = {}
+        # swimmer -> round -> number of swims
+        self.round_counts: dict[str, dict[str, int]] = {}
+
+    @staticmethod
+    def __add_medal(table: dict[str, list[int]], name: str, placing: int):
+        if name not in table:
+            table[name] = [0, 0, 0]
+        table[name][placing-1] += 1
+
+    def add_meet(self, meet_results: MeetResults):
+        '''Add the constructed rankings of a meet to the season totals'''
+        self.meet_names.append(meet_results.meet_name)
+
+        for event_name, rankings in meet_results.results.items():
+            res = meet_results.result_events[event_name]
+            event_key = f"{res.gender} {res.event_name} {res.age_group}"
+            medal_round = res.event_round in self.MEDAL_ROUNDS
+
+            for entry in rankings:
+                swimmer_counts = self.round_counts.setdefault(entry.swimmer_name, {})
+                swimmer_counts[res.event_round] = swimmer_counts.get(res.event_round, 0) + 1
+
+                # DSQ, DNS, ... keep their position in the rankings but are no placing
+                if entry.swim_time is None or entry.status:
+                    continue
+
+                best = self.best_placings.get((entry.swimmer_name, event_key))
+                if best is None or entry.placing < best[0]:
+                    self.best_placings[(entry.swimmer_name, event_key)] = \
+                        (entry.placing, meet_results.meet_name)
+
+                if medal_round and entry.placing < 4:
+                    self.__add_medal(self.medals_swimmers, entry.swimmer_name, entry.placing)
+                    self.__add_medal(self.medals_clubs, entry.club, entry.placing)
+                    self.__add_medal(self.medals_age_groups, res.age_group, entry.placing)
+
+        # Relay medals only count for the club
+        for event_name, rankings in meet_results.results_relays.items():
+            if meet_results.result_events[event_name].event_round not in self.MEDAL_ROUNDS:
+                continue
+
+            for entry in rankings:
+                if entry.swim_time is not None and not entry.status and entry.placing < 4:
+                    self.__add_medal(self.medals_clubs, entry.club, entry.placing)
+
+    def add_meets_from_files(self, lenex_paths: list[str], filters: list[str],
+                             max_workers: int = None, backend: str = "etree"):
+        '''Parse the results lenexes in parallel and add them to the season totals'''
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            futures = [executor.submit(_load_meet_results, path, filters, self.log.name,
+                                       backend) for path in lenex_paths]
+
+            # Keep the order of the given files
+            for path, future in zip(lenex_paths, futures):
+                self.log.info(f"Adding {os.path.basename(path)} to the season report")
+                for meet_results in future.result():
+                    self.add_meet(meet_results)
+
+    @staticmethod
+    def sorted_medal_table(table: dict[str, list[int]]) -> list[tuple[str, list[int]]]:
+        '''Sort a medal table on gold, then silver, then bronze'''
+        return sorted(table.items(), key=lambda item: (-item[1][0], -item[1][1],
+                                                       -item[1][2], item[0]))
@@ -0,0 +1,96 @@
+'''
+Contains the split times of the results of a meet. The splits are the bulk of a
+results lenex, so they are kept in flat integer arrays instead of an object per
+split: the splits of result i are at offsets[i]:offsets[i+1].
+'''
+
+from array import array
+from dataclasses import dataclass
+
+import xml.etree.ElementTree as ET
+
+from lib.swim_time import SwimTime
+
+@dataclass
+class PacingEntry:
+    '''Pacing of one result: the lap times, the difference of every lap with an
+       even paced lap and the fade (second half / first half of the race)'''
+    event_name: str
+    swim_time: SwimTime
+    lap_times: list[int]
+    lap_deltas: list[int]
+    fade: float
+
+class SplitTimes:
+    '''Cumulative split times (hundredths) and distances of all the results'''
+    def __init__(self):
+        self.distances = array("i")
+        self.times = array("i")
+        self.offsets = array("i", [0])
+        # Result id -> index in offsets
+        self.__result_index: dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self.__result_index)
+
+    def add_from_xml(self, result_id: str, splits_node: ET.Element):
+        '''Append the SPLIT children of a SPLITS node, splits without a time are skipped'''
+        for split_node in splits_node:
+            swim_time = SwimTime.from_lenex(split_node.attrib.get("swimtime"))
+            if swim_time is None:
+                continue
+
+            self.distances.append(int(split_node.attrib.get("distance", "0")))
+            self.times.append(swim_time)
+
+        if len(self.times) > self.offsets[-1]:
+            self.__result_index[result_id] = len(self.offsets) - 1
+            self.offsets.append(len(self.times))
+
+    def has_splits(self, result_id: str) -> bool:
+        '''Check if a result has split times'''
+        return result_id in self.__result_index
+
+    def get_splits(self, result_id: str) -> list[tuple[int, int]]:
+        '''The (distance, cumulative time) splits of a result, empty if none'''
+        index = self.__result_index.get(result_id)
+        if index is None:
+            return []
+
+        start, end = self.offsets[index], self.offsets[index+1]
+        return list(zip(self.distances[start:end], self.times[start:end]))
+
+    def iter_splits(self):
+        '''Iterate (result id, distance, cumulative time) over all the splits'''
+        for result_id, index in self.__result_index.items():
+            for split_index in range(self.offsets[index], self.offsets[index+1]):
+                yield result_id, self.distances[split_index], self.times[split_index]
+
+    def get_lap_times(self, result_id: str, swim_time: int) -> list[int]:
+        '''Time of every lap, the last lap ends at the final swim time'''
+        index = self.__result_index.get(result_id)
+        if index is None:
+            return []
+
+        cumulative = self.times[self.offsets[index]:self.offsets[index+1]]
+        # The last split is the finish in some lenexes
+        if cumulative[-1] != swim_time:
+            cumulative.append(swim_time)
+
+        return [end - start for start, end in zip([0] + cumulative[:-1].tolist(), cumulative)]
+
+    def get_pacing(self, result_id: str, event_name: str, swim_time: SwimTime) -> PacingEntry:
+        '''Lap times, deltas with an even pace and fade of a result, None without splits'''
+        lap_times = self.get_lap_times(result_id, swim_time)
+        if len(lap_times) < 2:
+            return None
+
+        even_lap = swim_time / len(lap_times)
+        lap_deltas = [round(lap_time - even_lap) for lap_time in lap_times]
+
+        # The middle lap of an odd number of laps is in neither half
+        half = len(lap_times) // 2
+        first_half = sum(lap_times[:half])
+        fade = sum(lap_times[-half:]) / first_half if first_half > 0 else 0.0
+
+        return PacingEntry(event_name, swim_time, lap_times, lap_deltas, fade)
@@ -0,0 +1,45 @@
+'''
+Contains the swim time type. Times are stored as integer hundredths of a second
+so they can be compared, sorted and aggregated without re-parsing.
+'''
+
+class SwimTime(int):
+    '''Swim time in hundredths of a second. Formatting is only done when displayed'''
+    HUNDREDTHS_PER_DAY = 24 * 60 * 60 * 100
+    # Number format for native excel time cells
+    EXCEL_NUM_FORMAT = "[mm]:ss.00"
+
+    @classmethod
+    def from_lenex(cls, swim_time: str) -> "SwimTime":
+        '''Parse a lenex swim time (HH:MM:SS.hh). Returns None for anything
+           that is not a time (e.g. NT or a missing attribute)'''
+        if swim_time is None or len(swim_time) != 11 or swim_time[2] != ":" or \
+                swim_time[5] != ":" or swim_time[8] != ".":
+            return None
+
+        try:
+            return cls(((int(swim_time[0:2]) * 60 + int(swim_time[3:5])) * 60 + \
+                        int(swim_time[6:8])) * 100 + int(swim_time[9:11]))
+        except ValueError:
+            return None
+
+    def to_lenex(self) -> str:
+        '''Format as a lenex swim time (HH:MM:SS.hh)'''
+        seconds, hundredths = divmod(int(self), 100)
+        minutes, seconds = divmod(seconds, 60)
+        hours, minutes = divmod(minutes, 60)
+        return f"{hours:02d}:{minutes:02d}:{seconds:02d}.{hundredths:02d}"
+
+    def to_excel(self) -> float:
+        '''Excel stores times as a fraction of a day'''
+        return int(self) / self.HUNDREDTHS_PER_DAY
+
+    def __str__(self) -> str:
+        # Hours are only shown when needed
+        lenex_time = self.to_lenex()
+        if lenex_time.startswith("00:"):
+            return lenex_time[3:]
+        return lenex_time
+
+    def __repr__(self) -> str:
+        return f"SwimTime({self})"
@@ -0,0 +1,351 @@
+'''
+Contains a minimal xlsx writer for the results excel. Every meet sheet is rendered
+to its worksheet xml part by a worker process, the main process only assembles
+the zip from the rendered parts and the shared workbook/styles parts.
+'''
+
+import logging
+
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from zipfile import ZipFile, ZIP_DEFLATED
+from xml.sax.saxutils import escape, quoteattr
+
+import xlsxwriter.utility
+
+from lib.meet_management import RankingsEntry
+from lib.swim_time import SwimTime
+
+MAIN_NS = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+REL_NS = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+PKG_REL_NS = "http://schemas.openxmlformats.org/package/2006/relationships"
+XML_HEADER = '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+
+# Index of every style in the cellXfs of the styles part
+STYLE_IDS = {"normal": 0, "bold": 1, "header": 2,
+             "podium": [3, 4, 5], "podium_time": [6, 7, 8], "normal_time": 9,
+             "podium_place": [10, 11, 12], "normal_place": 13}
+PODIUM_COLORS = ["FFFDDC5C", "FFD7D7D7", "FFA77044"]
+TIME_NUM_FORMAT_ID = 164
+PLACE_NUM_FORMAT_ID = 165
+# Placings written as numbers are displayed as "1."
+PLACE_NUM_FORMAT = '0"."'
+INVALID_SHEET_CHARS = set("[]:*?/\\")
+MAX_SHEET_NAME_LENGTH = 31
+
+def get_sheet_name(name: str, used_names: set[str]) -> str:
+    '''A valid sheet name that is not used yet (case insensitive, like Excel): the
+       name itself, else name_V2, name_V3, ... and SheetN if the name can not be used'''
+    used_names = {used_name.lower() for used_name in used_names}
+    if name and not name.startswith("'") and not name.endswith("'") and \
+       not INVALID_SHEET_CHARS & set(name):
+        sheet_name = name
+        version = 1
+        while sheet_name.lower() in used_names:
+            version += 1
+            sheet_name = f"{name}_V{version}"
+        if len(sheet_name) <= MAX_SHEET_NAME_LENGTH:
+            return sheet_name
+
+    number = len(used_names) + 1
+    while f"sheet{number}" in used_names:
+        number += 1
+    return f"Sheet{number}"
+
+class ResultsSheetPart:
+    '''Render the worksheet xml of a meet sheet, with the same layout as
+       the sheets written by ResultsExcel. Strings in shared_strings refer to the
+       shared strings part, all other strings are written inline'''
+    IND_RESULTS_COL = 1
+    RELAY_RESULTS_COL = 5
+
+    def __init__(self, shared_strings: dict[str, int] = None, numeric_placings: bool = False):
+        self.shared_strings = shared_strings or {}
+        self.numeric_placings = numeric_placings
+
+        # row -> list of (column, cell xml)
+        self.rows: dict[int, list[tuple[int, str]]] = {}
+        self.row_heights: dict[int, float] = {}
+        self.merged_ranges: list[str] = []
+
+    @staticmethod
+    def __column_width(width: float) -> float:
+        '''Convert the width in characters like xlsxwriter (Calibri 11)'''
+        return int((int(width * 7 + 0.5) + 5) / 7.0 * 256.0) / 256.0
+
+    def __add_cell(self, row: int, col: int, cell_xml: str):
+        self.rows.setdefault(row, []).append((col, cell_xml))
+
+    def write_string(self, row: int, col: int, value: str, style: int):
+        '''Add a string cell, as a shared string if possible, otherwise inline'''
+        reference = xlsxwriter.utility.xl_rowcol_to_cell(row, col)
+        shared_index = self.shared_strings.get(value)
+        if shared_index is not None:
+            self.__add_cell(row, col, f'<c r="{reference}" s="{style}" t="s">' + \
+                                      f'<v>{shared_index}</v></c>')
+            return
+
+        space = ' xml:space="preserve"' if value != value.strip() else ""
+        self.__add_cell(row, col, f'<c r="{reference}" s="{style}" t="inlineStr">' + \
+                                  f'<is><t{space}>{escape(value)}</t></is></c>')
+
+    def write_number(self, row: int, col: int, value: float, style: int):
+        '''Add a numeric cell'''
+        reference = xlsxwriter.utility.xl_rowcol_to_cell(row, col)
+        self.__add_cell(row, col, f'<c r="{reference}" s="{style}"><v>{value:.16g}</v></c>')
+
+    def merge_range(self, first_row: int, first_col: int, last_row: int, last_col: int,
+                    value: str, style: int):
+        '''Merge a range, the value is written in the first cell'''
+        self.write_string(first_row, first_col, value, style)
+        for row in range(first_row, last_row + 1):
+            for col in range(first_col, last_col + 1):
+                if (row, col) != (first_row, first_col):
+                    reference = xlsxwriter.utility.xl_rowcol_to_cell(row, col)
+                    self.__add_cell(row, col, f'<c r="{reference}" s="{style}"/>')
+
+        self.merged_ranges.append(xlsxwriter.utility.xl_range(first_row, first_col,
+                                                              last_row, last_col))
+
+    def __add_ranking(self, event_name: str, event_ranking: list[RankingsEntry],
+                      row_number: int, col_number: int) -> int:
+        self.merge_range(row_number, col_number, row_number, col_number+2,
+                         event_name, STYLE_IDS["bold"])
+
+        for ranking_entry in event_ranking:
+            if ranking_entry.placing < 4:
+                style = STYLE_IDS["podium"][int(ranking_entry.placing)-1]
+                time_style = STYLE_IDS["podium_time"][int(ranking_entry.placing)-1]
+                place_style = STYLE_IDS["podium_place"][int(ranking_entry.placing)-1]
+            else:
+                style = STYLE_IDS["normal"]
+                time_style = STYLE_IDS["normal_time"]
+                place_style = STYLE_IDS["normal_place"]
+            row_number += 1
+            if self.numeric_placings:
+                self.write_number(row_number, col_number, ranking_entry.placing, place_style)
+            else:
+                self.write_string(row_number, col_number, f"{ranking_entry.placing}.", style)
+            self.write_string(row_number, col_number+1, f"{ranking_entry.swimmer_name}", style)
+
+            if ranking_entry.swim_time is None:
+                self.write_string(row_number, col_number+2, "?", style)
+            else:
+                self.write_number(row_number, col_number+2, ranking_entry.swim_time.to_excel(),
+                                  time_style)
+
+        return row_number + 2
+
+    def add_results(self, rankings_individual: dict[str, list[RankingsEntry]],
+                    rankings_relay: dict[str, list[RankingsEntry]], meet_name: str):
+        '''Add the header and the individual and relay rankings'''
+        self.row_heights[0] = 3
+        self.row_heights[1] = 30
+
+        self.merge_range(1, 1, 1, 7, f"Results for {meet_name}", STYLE_IDS["header"])
+        self.merge_range(2, 1, 2, 3, "Individual", STYLE_IDS["header"])
+        self.merge_range(2, 5, 2, 7, "Relays", STYLE_IDS["header"])
+
+        row_number = 4
+        for event_name, event_ranking in rankings_individual.items():
+            row_number = self.__add_ranking(event_name, event_ranking, row_number,
+                                            self.IND_RESULTS_COL)
+
+        row_number = 4
+        for event_name, event_ranking in rankings_relay.items():
+            row_number = self.__add_ranking(event_name, event_ranking, row_number,
+                                            self.RELAY_RESULTS_COL)
+
+    def to_xml(self) -> bytes:
+        '''Get the complete worksheet part'''
+        column_widths = [3, 3, 35, 13, None, 3, 75, 13]
+        parts = [XML_HEADER, f'<worksheet xmlns="{MAIN_NS}" xmlns:r="{REL_NS}">',
+                 '<sheetFormatPr defaultRowHeight="15"/><cols>']
+        for col, width in enumerate(column_widths):
+            if width is not None:
+                parts.append(f'<col min="{col+1}" max="{col+1}" ' + \
+                             f'width="{self.__column_width(width):.16g}" customWidth="1"/>')
+        parts.append('</cols><sheetData>')
+
+        for row in sorted(self.rows.keys() | self.row_heights.keys()):
+            height = self.row_heights.get(row)
+            height_attributes = "" if height is None else f' ht="{height}" customHeight="1"'
+            parts.append(f'<row r="{row+1}"{height_attributes}>')
+            parts.extend(cell_xml for _, cell_xml in sorted(self.rows.get(row, [])))
+            parts.append('</row>')
+        parts.append('</sheetData>')
+
+        if self.merged_ranges:
+            parts.append(f'<mergeCells count="{len(self.merged_ranges)}">')
+            parts.extend(f'<mergeCell ref="{ref}"/>' for ref in self.merged_ranges)
+            parts.append('</mergeCells>')
+
+        parts.append('<pageMargins left="0.7" right="0.7" top="0.75" bottom="0.75" ' + \
+                     'header="0.3" footer="0.3"/></worksheet>')
+
+        return "".join(parts).encode("utf-8")
+
+def _render_results_sheet(rankings_individual: dict[str, list[RankingsEntry]],
+                          rankings_relay: dict[str, list[RankingsEntry]],
+                          meet_name: str, shared_strings: dict[str, int],
+                          numeric_placings: bool) -> bytes:
+    '''Worker: render the worksheet xml of one meet'''
+    sheet_part = ResultsSheetPart(shared_strings, numeric_placings)
+    sheet_part.add_results(rankings_individual, rankings_relay, meet_name)
+    return sheet_part.to_xml()
+
+class ResultsWorkbookWriter:
+    '''Assemble an xlsx from worksheet parts rendered in worker processes.
+       In compact mode placings are numbers and strings that are used more than
+       once go to the shared strings part, unique strings are written inline'''
+    def __init__(self, log: logging.Logger, file_path: str, compact: bool = False):
+        self.log = log
+        self.file_path = file_path
+        self.compact = compact
+        # (sheet name, rankings individual, rankings relay, meet name)
+        self.sheets: list[tuple[str, dict, dict, str]] = []
+        # string -> index in the shared strings part, only filled in compact mode
+        self.shared_strings: dict[str, int] = {}
+        self.string_count = 0
+
+    def add_results(self, rankings_individual: dict[str, list[RankingsEntry]],
+                    rankings_relay: dict[str, list[RankingsEntry]], meet_name: str):
+        '''Queue a meet sheet, it is only rendered when closing the workbook'''
+        sheet_name = get_sheet_name(meet_name, {name for name, _, _, _ in self.sheets})
+        self.sheets.append((sheet_name, rankings_individual, rankings_relay, meet_name))
+
+    def __build_shared_strings(self):
+        '''Put the strings that occur more than once (swimmer names, event names,
+           headers) in the shared strings table'''
+        string_counts = Counter()
+        for _, rankings_individual, rankings_relay, meet_name in self.sheets:
+            string_counts.update([f"Results for {meet_name}", "Individual", "Relays"])
+            for rankings in (rankings_individual, rankings_relay):
+                string_counts.update(rankings.keys())
+                for event_ranking in rankings.values():
+                    string_counts.update(entry.swimmer_name for entry in event_ranking)
+
+        repeated_strings = [value for value, count in string_counts.items() if count > 1]
+        self.shared_strings = {value: index for index, value in enumerate(repeated_strings)}
+        self.string_count = sum(string_counts[value] for value in repeated_strings)
+
+    def __shared_strings_xml(self) -> str:
+        items = "".join(
+            f'<si><t xml:space="preserve">{escape(value)}</t></si>'
+            if value != value.strip() else f'<si><t>{escape(value)}</t></si>'
+            for value in self.shared_strings)
+        return XML_HEADER + f'<sst xmlns="{MAIN_NS}" count="{self.string_count}" ' + \
+               f'uniqueCount="{len(self.shared_strings)}">{items}</sst>'
+
+    @staticmethod
+    def __styles_xml() -> str:
+        fills = ['<fill><patternFill patternType="none"/></fill>',
+                 '<fill><patternFill patternType="gray125"/></fill>']
+        fills += [f'<fill><patternFill patternType="solid"><fgColor rgb="{color}"/>' + \
+                  '<bgColor indexed="64"/></patternFill></fill>' for color in PODIUM_COLORS]
+
+        xfs = ['<xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>',
+               '<xf numFmtId="0" fontId="1" fillId="0" borderId="0" xfId="0" applyFont="1"/>',
+               '<xf numFmtId="0" fontId="1" fillId="0" borderId="1" xfId="0" applyFont="1" ' + \
+               'applyBorder="1" applyAlignment="1">' + \
+               '<alignment horizontal="center" vertical="center"/></xf>']
+        xfs += [f'<xf numFmtId="0" fontId="0" fillId="{fill}" borderId="0" xfId="0" ' + \
+                'applyFill="1"/>' for fill in range(2, 5)]
+        xfs += [f'<xf numFmtId="{TIME_NUM_FORMAT_ID}" fontId="0" fillId="{fill}" borderId="0" ' + \
+                'xfId="0" applyNumberFormat="1" applyFill="1"/>' for fill in range(2, 5)]
+        xfs.append(f'<xf numFmtId="{TIME_NUM_FORMAT_ID}" fontId="0" fillId="0" borderId="0" ' + \
+                   'xfId="0" applyNumberFormat="1"/>')
+        xfs += [f'<xf numFmtId="{PLACE_NUM_FORMAT_ID}" fontId="0" fillId="{fill}" ' + \
+                'borderId="0" xfId="0" applyNumberFormat="1" applyFill="1"/>'
+                for fill in range(2, 5)]
+        xfs.append(f'<xf numFmtId="{PLACE_NUM_FORMAT_ID}" fontId="0" fillId="0" borderId="0" ' + \
+                   'xfId="0" applyNumberFormat="1"/>')
+
+        font = '<sz val="11"/><color theme="1"/><name val="Calibri"/><family val="2"/>' + \
+               '<scheme val="minor"/>'
+        return XML_HEADER + f'<styleSheet xmlns="{MAIN_NS}">' + \
+               f'<numFmts count="2"><numFmt numFmtId="{TIME_NUM_FORMAT_ID}" ' + \
+               f'formatCode={quoteattr(SwimTime.EXCEL_NUM_FORMAT)}/>' + \
+               f'<numFmt numFmtId="{PLACE_NUM_FORMAT_ID}" ' + \
+               f'formatCode={quoteattr(PLACE_NUM_FORMAT)}/></numFmts>' + \
+               f'<fonts count="2"><font>{font}</font><font><b/>{font}</font></fonts>' + \
+               f'<fills count="{len(fills)}">{"".join(fills)}</fills>' + \
+               '<borders count="2"><border><left/><right/><top/><bottom/><diagonal/></border>' + \
+               '<border><left/><right/><top/><bottom style="thin"><color auto="1"/></bottom>' + \
+               '<diagonal/></border></borders>' + \
+               '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/>' + \
+               f'</cellStyleXfs><cellXfs count="{len(xfs)}">{"".join(xfs)}</cellXfs>' + \
+               '<cellStyles count="1"><cellStyle name="Normal" xfId="0" builtinId="0"/>' + \
+               '</cellStyles></styleSheet>'
+
+    def __workbook_parts(self) -> dict[str, str]:
+        sheet_numbers = range(1, len(self.sheets) + 1)
+        sheet_overrides = "".join(
+            f'<Override PartName="/xl/worksheets/sheet{i}.xml" ContentType="application/' + \
+            'vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+            for i in sheet_numbers)
+        sheets = "".join(f'<sheet name={quoteattr(name)} sheetId="{i}" r:id="rId{i}"/>'
+                         for i, (name, _, _, _) in zip(sheet_numbers, self.sheets))
+        sheet_rels = "".join(
+            f'<Relationship Id="rId{i}" Type="{REL_NS}/worksheet" ' + \
+            f'Target="worksheets/sheet{i}.xml"/>' for i in sheet_numbers)
+        styles_id = len(self.sheets) + 1
+        shared_strings_override = ""
+        if self.shared_strings:
+            shared_strings_override = \
+                '<Override PartName="/xl/sharedStrings.xml" ContentType="application/' + \
+                'vnd.openxmlformats-officedocument.spreadsheetml.sharedStrings+xml"/>'
+            sheet_rels += f'<Relationship Id="rId{styles_id + 1}" ' + \
+                          f'Type="{REL_NS}/sharedStrings" Target="sharedStrings.xml"/>'
+
+        parts = {
+            "[Content_Types].xml": XML_HEADER + \
+                '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">' + \
+                '<Default Extension="rels" ContentType="application/' + \
+                'vnd.openxmlformats-package.relationships+xml"/>' + \
+                '<Default Extension="xml" ContentType="application/xml"/>' + \
+                '<Override PartName="/xl/workbook.xml" ContentType="application/' + \
+                'vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>' + \
+                '<Override PartName="/xl/styles.xml" ContentType="application/' + \
+                'vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>' + \
+                f'{sheet_overrides}{shared_strings_override}</Types>',
+            "_rels/.rels": XML_HEADER + f'<Relationships xmlns="{PKG_REL_NS}">' + \
+                f'<Relationship Id="rId1" Type="{REL_NS}/officeDocument" ' + \
+                'Target="xl/workbook.xml"/></Relationships>',
+            "xl/workbook.xml": XML_HEADER + \
+                f'<workbook xmlns="{MAIN_NS}" xmlns:r="{REL_NS}">' + \
+                f'<bookViews><workbookView/></bookViews><sheets>{sheets}</sheets></workbook>',
+            "xl/_rels/workbook.xml.rels": XML_HEADER + \
+                f'<Relationships xmlns="{PKG_REL_NS}">{sheet_rels}' + \
+                f'<Relationship Id="rId{styles_id}" Type="{REL_NS}/styles" ' + \
+                'Target="styles.xml"/></Relationships>',
+            "xl/styles.xml": self.__styles_xml(),
+        }
+        if self.shared_strings:
+            parts["xl/sharedStrings.xml"] = self.__shared_strings_xml()
+
+        return parts
+
+    def close(self, max_workers: int = None):
+        '''Render all the sheets in worker processes and write the xlsx'''
+        if not self.sheets:
+            raise ValueError("Cannot create an excel without sheets")
+
+        if self.compact:
+            self.__build_shared_strings()
+
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            futures = [executor.submit(_render_results_sheet, individual, relay, meet_name,
+                                       self.shared_strings, self.compact)
+                       for _, individual, relay, meet_name in self.sheets]
+
+            with ZipFile(self.file_path, 'w', compression=ZIP_DEFLATED) as zipped_file:
+                for part_name, part in self.__workbook_parts().items():
+                    zipped_file.writestr(part_name, part)
+
+                # Sheets are written in order as soon as they are rendered
+                for sheet_number, future in enumerate(futures, 1):
+                    zipped_file.writestr(f"xl/worksheets/sheet{sheet_number}.xml",
+                                         future.result())
+
+        self.log.debug(f"Rendered {len(self.sheets)} sheets in parallel")
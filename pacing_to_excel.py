@@ -0,0 +1,40 @@
+'''
+Import a results lenex and put the pacing of every swim of the club (lap times,
+fade) and the relay legs its swimmers swam into an excel
+'''
+
+from settings import Settings
+from lib.meet_management import LenexHelper
+from lib.lenex_index import load_meet_results
+from lib.results_excel import ResultsExcel
+
+CLUB = "BRABO"
+
+def create_pacing_excel(log) -> None:
+    '''Pacing sheet per swimmer and a sheet with the relay legs of the club'''
+    lenex = LenexHelper(log, "C:/Users/brabo/Lenex_register-Excel-Generator/")
+    lenex.load_lenex()
+    lenex.extract_lef_from_lenex()
+
+    swimmer_pacing = {}
+    swimmer_relay_legs = {}
+    for meet_results in load_meet_results(log, lenex.get_lef_path(), [f"ONLY_CLUB={CLUB}"],
+                                          club_scoped=True,
+                                          backend=Settings.get_parser_backend()):
+        for swimmer_name, pacing in meet_results.get_swimmer_pacing(CLUB).items():
+            swimmer_pacing.setdefault(swimmer_name, []).extend(pacing)
+        for swimmer_name, relay_legs in meet_results.get_swimmer_relay_legs(CLUB).items():
+            swimmer_relay_legs.setdefault(swimmer_name, []).extend(relay_legs)
+
+    results_excel = ResultsExcel(log, "PACING")
+    results_excel.add_pacing_sheets(swimmer_pacing)
+    results_excel.add_relay_legs_sheet(swimmer_relay_legs)
+    results_excel.close()
+
+def main():
+    '''Main'''
+    create_pacing_excel(Settings.get_logger())
+
+
+if __name__ == "__main__":
+    main()
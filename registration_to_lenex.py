@@ -0,0 +1,47 @@
+'''
+Read back a filled in registration excel and convert the selected events
+into an entries lenex that can be imported in the meet software
+'''
+
+from easygui import fileopenbox
+
+from settings import Settings
+from lib.club_management import Club
+from lib.meet_management import SwimMeet, LenexHelper
+from lib.registration_reader import RegistrationReader
+from lib.lenex_writer import LenexEntriesWriter
+
+def main() -> None:
+    '''Main to load the club, the competition and the registration excel
+       and write the entries lenex'''
+    # Load or create the settings
+    settings = Settings.init_settings()
+    log = Settings.get_logger()
+
+    # Create a club using the provided mdb
+    club = Club(log, settings.club_name)
+    club.fill_using_team_manager_mdb(settings.mdb_path)
+
+    # Load in the competition lenex and extract the xml
+    lenex = LenexHelper(log, settings.default_competition_path)
+    lenex.load_lenex()
+    lenex.extract_lef_from_lenex()
+    lenex.load_xml_from_lef(settings.parser_backend)
+
+    # Construct a swim meet from the xml
+    meet = SwimMeet(log)
+    meet.load_from_xml(lenex.xml_root)
+
+    # Read the entries from the filled in registration excel
+    registration_path = fileopenbox(default="tmp/", title="Select the filled in registration excel")
+    if registration_path is None:
+        raise ValueError("Invalid file selected")
+    entries = RegistrationReader(log, registration_path).read_entries()
+
+    # Write the entries lenex
+    writer = LenexEntriesWriter(log, meet)
+    print(f"Entries saved at {writer.write_entries(club, entries)}")
+
+
+if __name__ == "__main__":
+    main()
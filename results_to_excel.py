@@ -3,24 +3,49 @@ Import the results lenex, extract all the rankings. Apply filters and put the re
 into an excel
 '''
 
+import os
+
 from settings import Settings
-from lib.meet_management import LenexHelper, MeetResults
+from lib.meet_management import LenexHelper
+from lib.lenex_index import load_meet_results
 from lib.results_excel import ResultsExcel
+from lib.results_database import ResultsDatabase
+from lib.points import BaseTimes, PointsCalculator
+
+# Add the World Aquatics points rankings, skipped when there are no base times in
+# data/base_times.csv
+ADD_POINTS_RANKINGS = True
+# Rank the individual events in (first, last) birth years instead of the age groups
+# of the lenex, e.g. [(2012, 2012), (2010, 2011)], empty to keep the lenex age groups
+BIRTH_YEAR_GROUPS: list[tuple[int, int]] = []
+# Render the meet sheets in worker processes when saving the excel, faster for many
+# meets but without the points rankings (only meet sheets are supported)
+PARALLEL_SHEETS = False
+# Write the placings as numbers (shown as "1.") and, with parallel sheets, only the
+# repeated strings in the shared strings, a smaller excel
+COMPACT_SHEETS = False
 
-def add_results_to_workbook(log, excel, filters):
-    '''Load lenex, create results and add to excel'''
+def add_results_to_workbook(log, excel, database, filters, points=None):
+    '''Load lenex, create results and add to excel. Every meet of a multi
+       meet lenex gets its own sheet'''
     lenex = LenexHelper(log, "C:/Users/brabo/Lenex_register-Excel-Generator/")
     lenex.load_lenex()
     lenex.extract_lef_from_lenex()
-    lenex.load_xml_from_lef()
 
-    meet_results = MeetResults(log, lenex.xml_root)
-    meet_results.construct_rankings(filters)
-    meet_results.print_rankings()
+    # Only the filtered club is parsed completely, of the other clubs only the
+    # athletes, relays and results needed for the rankings
+    for meet_results in load_meet_results(log, lenex.get_lef_path(), filters,
+                                          club_scoped=True,
+                                          birth_year_groups=BIRTH_YEAR_GROUPS,
+                                          backend=Settings.get_parser_backend()):
+        meet_results.print_rankings()
+        database.ingest(meet_results)
+        if points is not None:
+            points.add_meet(meet_results)
 
-    excel.add_results_to_excel(meet_results.results,
-                               meet_results.results_relays,
-                               meet_results.meet_name)
+        excel.add_results_to_excel(meet_results.results,
+                                   meet_results.results_relays,
+                                   meet_results.meet_name)
 
 def create_bk_podia_excel(log) -> None:
     '''For the 4 different BC's, extract the podia and put into excel'''
@@ -30,16 +55,30 @@ def create_bk_podia_excel(log) -> None:
     basic_filters_finals = basic_filters.copy()
     basic_filters_finals.append("ONLY_FINALS")
 
-    results_excel = ResultsExcel(log, "BK_PODIA")
+    points = None
+    if ADD_POINTS_RANKINGS and PARALLEL_SHEETS:
+        log.warning("The points rankings can not be added to parallel sheets, skipping them")
+    elif ADD_POINTS_RANKINGS and not os.path.exists(BaseTimes.DEFAULT_PATH):
+        log.warning(f"No base times at {BaseTimes.DEFAULT_PATH}, skipping the points " + \
+                    "rankings (see BaseTimes in lib/points.py)")
+    elif ADD_POINTS_RANKINGS:
+        points = PointsCalculator(log, BaseTimes(log))
+
+    results_excel = ResultsExcel(log, "BK_PODIA", parallel=PARALLEL_SHEETS,
+                                 compact=COMPACT_SHEETS)
+    database = ResultsDatabase(log)
     log.info("BK Open")
-    add_results_to_workbook(log, results_excel, basic_filters_finals)
+    add_results_to_workbook(log, results_excel, database, basic_filters_finals, points)
     log.info("BK 25M")
-    add_results_to_workbook(log, results_excel, basic_filters_finals)
+    add_results_to_workbook(log, results_excel, database, basic_filters_finals, points)
     log.info("BK Cat 1")
-    add_results_to_workbook(log, results_excel, basic_filters)
+    add_results_to_workbook(log, results_excel, database, basic_filters, points)
     log.info("BK Cat 2")
-    add_results_to_workbook(log, results_excel, basic_filters_finals)
+    add_results_to_workbook(log, results_excel, database, basic_filters_finals, points)
+    if points is not None:
+        results_excel.add_points_rankings(points)
     results_excel.close()
+    database.close()
 
 def main():
     '''Main'''
@@ -0,0 +1,37 @@
+'''
+Import all the results lenexes of a season, aggregate the rankings and put the
+medal tables, best placings and swims per round into an excel
+'''
+
+import glob
+import os
+
+from easygui import diropenbox
+
+from settings import Settings
+from lib.results_excel import ResultsExcel
+from lib.season_report import SeasonReport
+
+def create_season_excel(log) -> None:
+    '''Aggregate all the results lenexes in the selected folder'''
+    results_dir = diropenbox(title="Select the folder with the results of the season")
+    if results_dir is None:
+        raise ValueError("Invalid folder selected")
+
+    lenex_paths = sorted(glob.glob(os.path.join(results_dir, "*.lxf")))
+    log.info(f"Found {len(lenex_paths)} results lenexes")
+
+    season_report = SeasonReport(log)
+    season_report.add_meets_from_files(lenex_paths, [], backend=Settings.get_parser_backend())
+
+    results_excel = ResultsExcel(log, "SEASON_REPORT")
+    results_excel.add_season_report(season_report)
+    results_excel.close()
+
+def main():
+    '''Main'''
+    create_season_excel(Settings.get_logger())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,31 @@
+'''
+Run a local server keeping the parsed meets and the club in memory, see
+lib/meet_server.py for the available requests
+'''
+
+from settings import Settings
+from lib.club_management import Club
+from lib.meet_server import MeetCache, MeetServer
+
+def serve_meets(settings: Settings, log, port: int = 8080, max_meets: int = 8) -> None:
+    '''Serve until interrupted'''
+    club = Club(log, settings.club_name)
+    club.fill_using_team_manager_mdb(settings.mdb_path)
+
+    server = MeetServer(log, club, MeetCache(log, max_meets, backend=settings.parser_backend),
+                        port)
+    log.info(f"Serving meets on http://127.0.0.1:{port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        log.info("Stopped serving")
+    finally:
+        server.server_close()
+
+def main():
+    '''Main'''
+    serve_meets(Settings.init_settings(), Settings.get_logger())
+
+
+if __name__ == "__main__":
+    main()
@@ -6,11 +6,16 @@ import logging.config
 
 from easygui import diropenbox, fileopenbox
 
+from lib.lenex_parsers import get_backends
+
 class Settings:
     '''Containers to save different global setting
        and save them to use it in next runs'''
     SAVE_FILE = "data/.settings.pk"
     log = None
+    # Parser backend of the lefs (see lib/lenex_parsers.py), a class attribute
+    # such that settings saved before it existed still have it
+    parser_backend = "etree"
 
     def __init__(self):
         self.club_name = ""
@@ -39,6 +44,10 @@ class Settings:
                                                       with the competition folders")
         setting.club_logo_path = fileopenbox(title="Select the club logo to add\
                                              to all the excel sheets")
+        setting.parser_backend = input(f"Lef parser backend {get_backends()} " + \
+                                       "(empty for etree): ") or "etree"
+        if setting.parser_backend not in get_backends():
+            raise ValueError(f"Unknown parser backend {setting.parser_backend}")
 
         # Save current settings
         with open(Settings.SAVE_FILE, "wb") as fi:
@@ -46,6 +55,16 @@ class Settings:
 
         return setting
 
+    @staticmethod
+    def get_parser_backend() -> str:
+        '''The parser backend of the saved settings, without asking for the other
+           settings when there are none'''
+        if os.path.exists(Settings.SAVE_FILE):
+            with open(Settings.SAVE_FILE, "rb") as fi:
+                return pickle.load(fi).parser_backend
+
+        return Settings.parser_backend
+
     @staticmethod
     def get_logger():
         '''Get the global logger'''
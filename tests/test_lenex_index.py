@@ -0,0 +1,74 @@
+'''Tests of the byte offset index over a lef'''
+import os
+import logging
+import tempfile
+import unittest
+
+from lib.lenex_index import LenexIndex, load_meet_results
+
+LEF = '''<?xml version="1.0" encoding="ISO-8859-1"?>
+<LENEX version="3.0">
+<MEETS>
+<MEET name="Meeting Liège" city="Liège" course="LCM"><AGEDATE value="2024-12-31" type="YEAR"/>
+<SESSIONS><SESSION number="1" date="2024-03-10"><EVENTS>
+<EVENT eventid="1" number="1" gender="F" round="TIM"><SWIMSTYLE distance="50" stroke="FREE" relaycount="1"/>
+<AGEGROUPS><AGEGROUP agegroupid="1" agemin="-1" agemax="-1"><RANKINGS>
+<RANKING place="1" resultid="2"/><RANKING place="2" resultid="1"/>
+</RANKINGS></AGEGROUP></AGEGROUPS></EVENT>
+</EVENTS></SESSION></SESSIONS>
+<CLUBS>
+<CLUB code="ÉLAN" name="Élan Zwemclub" nation="BEL"><ATHLETES>
+<ATHLETE athleteid="1" firstname="Zoë" lastname="Lefèvre" gender="F" birthdate="2012-05-01" nation="BEL">
+<RESULTS><RESULT resultid="1" eventid="1" swimtime="00:00:35.00"/></RESULTS></ATHLETE>
+</ATHLETES></CLUB>
+<CLUB code="ANDER" name="Andere club" nation="BEL"><ATHLETES>
+<ATHLETE athleteid="2" firstname="Anaïs" lastname="Müller" gender="F" birthdate="2012-01-01" nation="BEL">
+<RESULTS><RESULT resultid="2" eventid="1" swimtime="00:00:34.00"/></RESULTS></ATHLETE>
+</ATHLETES></CLUB>
+</CLUBS>
+</MEET>
+</MEETS>
+</LENEX>
+'''
+
+class TestLenexIndexEncoding(unittest.TestCase):
+    '''Lefs that are not utf-8 are parsed with their declared encoding'''
+    def setUp(self):
+        self.log = logging.getLogger("test")
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.lef_path = os.path.join(self.tmp_dir.name, "latin1.lef")
+        with open(self.lef_path, "wb") as fo:
+            fo.write(LEF.encode("iso-8859-1"))
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_meet_root(self):
+        lenex_index = LenexIndex(self.log, self.lef_path)
+        meet_root = lenex_index.get_meet_root(0)
+        lenex_index.close()
+
+        self.assertEqual(meet_root.find("MEETS/MEET").attrib["city"], "Liège")
+        self.assertEqual([athlete.attrib["firstname"] for athlete in meet_root.iter("ATHLETE")],
+                         ["Zoë", "Anaïs"])
+
+    def test_club_meet_root(self):
+        lenex_index = LenexIndex(self.log, self.lef_path)
+        self.assertEqual(sorted(lenex_index.get_club_ranges(0)), ["ANDER", "ÉLAN"])
+        meet_root = lenex_index.get_club_meet_root(0, "ÉLAN")
+        lenex_index.close()
+
+        self.assertEqual([athlete.attrib["lastname"] for athlete in meet_root.iter("ATHLETE")],
+                         ["Lefèvre", "Müller"])
+
+    def test_club_rankings(self):
+        meet_results = load_meet_results(self.log, self.lef_path, ["ONLY_CLUB=ÉLAN"],
+                                         club_scoped=True)[0]
+
+        self.assertEqual(meet_results.meet_name, "Meeting Liège")
+        ranking = next(iter(meet_results.results.values()))
+        self.assertEqual([(entry.placing, entry.swimmer_name) for entry in ranking],
+                         [(2, "Zoë Lefèvre")])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,31 @@
+'''
+Watch a folder with results lenexes during a meet and keep the podium excel up to
+date every time the organizer republishes the results
+'''
+
+from easygui import diropenbox
+
+from settings import Settings
+from lib.results_watcher import ResultsWatcher
+
+def watch_podia(log) -> None:
+    '''Keep the podia of the club in tmp/LIVE_PODIA.xlsx up to date'''
+    watch_dir = diropenbox(title="Select the folder with the results lenexes")
+    if watch_dir is None:
+        raise ValueError("Invalid folder selected")
+
+    watcher = ResultsWatcher(log, watch_dir, "LIVE_PODIA",
+                             ["ONLY_NAT=BEL", "ONLY_CLUB=BRABO", "ONLY_PODIUM"],
+                             backend=Settings.get_parser_backend())
+    try:
+        watcher.watch()
+    except KeyboardInterrupt:
+        log.info("Stopped watching")
+
+def main():
+    '''Main'''
+    watch_podia(Settings.get_logger())
+
+
+if __name__ == "__main__":
+    main()